@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.synthetic import StubDetector, SyntheticScene, write_video
+from src.engine.capture import CapturedFrame
+from src.engine.multicam import Camera, CameraResult
+from src.engine.render import CameraRenderer
+from src.engine.tracking import load_tracker_args
+
+# --- BENCHMARK CONFIG ---
+TRACKER_CONFIG = os.path.join(ROOT_DIR, "config", "my_tracker.yaml")
+STAGES = ('capture', 'detect', 'track', 'count', 'render', 'display')
+PERCENTILES = (50, 95, 99)
+DISPLAY_WIDTH = 1280
+
+
+def peak_rss_mb():
+    # resource is not available on Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(timings, frames, wall_time):
+    stages = {}
+    for name in STAGES:
+        values = np.array(timings[name]) * 1000
+        if len(values) == 0:
+            continue
+        stages[name] = {
+            'mean_ms': round(float(values.mean()), 3),
+            **{f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES},
+            'max_fps': round(1000 / max(float(values.mean()), 1e-6), 1),
+        }
+    return {
+        'frames': frames,
+        'wall_time_s': round(wall_time, 3),
+        'throughput_fps': round(frames / max(wall_time, 1e-6), 1),
+        'peak_rss_mb': None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+        'stages': stages,
+    }
+
+
+def run_benchmark(args, video_path, scene):
+    if args.model:
+        from src.engine.detector import Detector
+        detector = Detector(args.model, imgsz=args.imgsz, backend=args.backend)
+    else:
+        detector = StubDetector(scene, imgsz=args.imgsz, delay=args.stub_delay / 1000)
+
+    camera = Camera(scene.camera_config(video_path), load_tracker_args(TRACKER_CONFIG), detector.names)
+    renderer = None
+    if args.render != 'headless':
+        renderer = CameraRenderer(camera.polygons, detector.names, args.render, DISPLAY_WIDTH,
+                                  [line.points for line in camera.lines])
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video: {video_path}")
+    buf = np.empty((scene.height, scene.width, 3), dtype=np.uint8)
+
+    timings = {name: [] for name in STAGES}
+    frames = 0
+    t_start = t_end = None
+    try:
+        while True:
+            index = frames
+            t0 = time.perf_counter()
+            if frames == args.warmup:
+                # The clock starts with the first measured frame (also with --warmup 0)
+                t_start = t0
+            ret, image = cap.read(buf)
+            if not ret:
+                break
+            t1 = time.perf_counter()
+            det = detector.detect([image])[0]
+            t2 = time.perf_counter()
+            tracks = camera.tracker.update(det, image)
+            t3 = time.perf_counter()
+
+            result = CameraResult(camera, CapturedFrame(image, time.time(), 0.0, index, lambda: None), tracks)
+            result.inside_flags = camera.counter.update(tracks)
+            result.vehicle_counts = dict(camera.counter.vehicle_counts)
+            result.events = camera.counter.new_events
+            t4 = time.perf_counter()
+
+            stage_times = [('capture', t1 - t0), ('detect', t2 - t1), ('track', t3 - t2), ('count', t4 - t3)]
+            if renderer is not None:
+                frame_show = renderer.render(result)
+                t5 = time.perf_counter()
+                stage_times.append(('render', t5 - t4))
+                if args.show:
+                    cv2.imshow("benchmark", frame_show)
+                    cv2.waitKey(1)
+                    stage_times.append(('display', time.perf_counter() - t5))
+
+            frames += 1
+            if frames > args.warmup:
+                for name, value in stage_times:
+                    timings[name].append(value)
+                t_end = time.perf_counter()
+    finally:
+        cap.release()
+        if args.show:
+            cv2.destroyAllWindows()
+
+    measured = max(frames - args.warmup, 0)
+    wall_time = t_end - t_start if t_end is not None else 0.0
+    report = summarize(timings, measured, wall_time)
+    report['final_counts'] = dict(camera.counter.vehicle_counts)
+    return report
+
+
+def print_report(report):
+    print("-" * 72)
+    print(f"{'STAGE':<10}|{'MEAN ms':^10}|{'P50 ms':^10}|{'P95 ms':^10}|{'P99 ms':^10}|{'MAX FPS':^10}")
+    print("-" * 72)
+    for name, st in report['stages'].items():
+        print(f"{name:<10}|{st['mean_ms']:^10.2f}|{st['p50_ms']:^10.2f}|{st['p95_ms']:^10.2f}|"
+              f"{st['p99_ms']:^10.2f}|{st['max_fps']:^10.1f}")
+    print("-" * 72)
+    print(f"Frames: {report['frames']}  Throughput: {report['throughput_fps']} fps  "
+          f"Peak RSS: {report['peak_rss_mb']} MB")
+    print(f"Final counts: {report['final_counts']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the counting pipeline on synthetic video")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10, help="frames excluded from the statistics")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--boxes", type=int, default=20, help="moving boxes in the synthetic scene")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", choices=('source', 'display', 'headless'), default='display')
+    parser.add_argument("--show", action="store_true", help="also time cv2.imshow (needs a display)")
+    parser.add_argument("--model", help="real model weights instead of the stub detector")
+    parser.add_argument("--backend", default='torch', help="detector backend with --model")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--stub-delay", type=float, default=0.0, help="simulated inference time per frame in ms")
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout only)")
+    args = parser.parse_args()
+
+    scene = SyntheticScene(args.width, args.height, args.boxes, args.seed)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        video_path = os.path.join(tmp_dir, "synthetic.avi")
+        print(f"[INFO] Writing {args.frames} synthetic frames ({args.width}x{args.height}, {args.boxes} boxes)...")
+        write_video(scene, video_path, args.frames + args.warmup)
+        report = run_benchmark(args, video_path, scene)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report['config'] = {k: v for k, v in vars(args).items() if k != 'output'}
+    report['environment'] = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+    print_report(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f"[INFO] Report saved to: {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import time
+
+import cv2
+import numpy as np
+
+from src.engine.config import CameraConfig, CountingLine, Zone
+
+CLASS_NAMES = {0: 'bus', 1: 'car', 2: 'motor', 3: 'truck'}
+BOX_SIZES = {0: (220, 160), 1: (120, 90), 2: (40, 60), 3: (200, 150)}   # (w, h) at 1080p
+CLASS_COLORS = {0: (40, 40, 200), 1: (40, 200, 40), 2: (200, 200, 40), 3: (90, 60, 30)}
+BACKGROUND = 90
+
+
+# --- SYNTHETIC TRAFFIC SCENE ---
+# Boxes drive down the frame at constant speed and re-enter at the top, so
+# every seed gives the same video and the same ground truth.
+class SyntheticScene:
+    def __init__(self, width=1920, height=1080, num_boxes=20, seed=0):
+        self.width = width
+        self.height = height
+        self.num_boxes = num_boxes
+        rng = np.random.default_rng(seed)
+        scale = height / 1080
+
+        self.clss = rng.integers(0, len(CLASS_NAMES), num_boxes)
+        self.sizes = np.array([BOX_SIZES[c] for c in self.clss], dtype=np.float32) * scale
+        self.x = rng.uniform(0, width - self.sizes[:, 0])
+        self.y0 = rng.uniform(0, height + self.sizes[:, 1])
+        self.vy = rng.uniform(4, 14, num_boxes) * scale
+        self.vx = rng.uniform(-1, 1, num_boxes) * scale
+        self.scores = rng.uniform(0.55, 0.95, num_boxes).astype(np.float32)
+
+    def boxes(self, index):
+        # (N, 6) x1, y1, x2, y2, conf, cls of the boxes visible on frame `index`
+        period = self.height + self.sizes[:, 1]
+        y = (self.y0 + self.vy * index) % period - self.sizes[:, 1]
+        x = np.clip(self.x + self.vx * index, 0, self.width - self.sizes[:, 0])
+        data = np.stack([x, y, x + self.sizes[:, 0], y + self.sizes[:, 1],
+                         self.scores, self.clss.astype(np.float32)], axis=1).astype(np.float32)
+        visible = (data[:, 1] < self.height) & (data[:, 3] > 0)
+        data = data[visible]
+        data[:, [0, 2]] = np.clip(data[:, [0, 2]], 0, self.width)
+        data[:, [1, 3]] = np.clip(data[:, [1, 3]], 0, self.height)
+        return data
+
+    def frame(self, index):
+        image = np.full((self.height, self.width, 3), BACKGROUND, dtype=np.uint8)
+        for x1, y1, x2, y2, _, cls in self.boxes(index):
+            cv2.rectangle(image, (int(x1), int(y1)), (int(x2), int(y2)), CLASS_COLORS[int(cls)], -1)
+        return image
+
+    def camera_config(self, source):
+        # One zone over the middle band of the frame and a line across it
+        w, h = self.width, self.height
+        zone = np.array([[0, int(h * 0.4)], [w - 1, int(h * 0.4)],
+                         [w - 1, int(h * 0.6)], [0, int(h * 0.6)]])
+        line = np.array([[0, int(h * 0.5)], [w - 1, int(h * 0.5)]])
+        return CameraConfig("synthetic", source, [Zone("roi", zone)], [CountingLine("center", line)])
+
+
+def write_video(scene, path, num_frames, fps=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (scene.width, scene.height))
+    if not writer.isOpened():
+        raise IOError(f"Failed to create video: {path}")
+    for i in range(num_frames):
+        writer.write(scene.frame(i))
+    writer.release()
+
+
+# --- STUB DETECTOR ---
+# Same interface as src.engine.detector.Detector, but returns the scene's
+# ground truth for consecutive frames instead of running a model. Needs no
+# weights; `delay` simulates the forward pass (seconds per frame).
+class StubDetector:
+    def __init__(self, scene, conf=0.25, imgsz=640, delay=0.0):
+        from ultralytics.engine.results import Boxes
+
+        self.Boxes = Boxes
+        self.scene = scene
+        self.names = CLASS_NAMES
+        self.model_path = None
+        self.backend = 'stub'
+        self.conf = conf
+        self.imgsz = imgsz
+        self.delay = delay
+        self.index = 0
+
+    def detect(self, frames, imgsz=None):
+        results = []
+        for frame in frames:
+            data = self.scene.boxes(self.index)
+            data = data[data[:, 4] >= self.conf]
+            results.append(self.Boxes(data, frame.shape[:2]))
+            self.index += 1
+        if self.delay:
+            time.sleep(self.delay * len(frames))
+        return results
@@ -1,236 +1,337 @@
+import argparse
 import cv2
-import numpy as np
-from ultralytics import YOLO
-import time
-import threading
-import queue
 import os
 import sys
+import time
+
+from src.engine import render
+from src.engine.config import load_cameras
+from src.engine.control import QualityController, build_levels
+from src.engine.detector import BACKENDS, Detector
+from src.engine.metrics import CountingMetrics, MetricsRegistry, MetricsServer, StartupClock
+from src.engine.multicam import MultiCameraEngine
+from src.engine.offline import OfflineRunner
+from src.engine.pipeline import Pipeline
+from src.engine.publisher import PUBLISH_URL, StreamPublisher, stream_path
+from src.engine.storage import CountStore, write_report
+from src.engine.tracking import load_tracker_args
 
 # --- Run MediaMTX and FFMPEG
 # .\mediamtx.exe
 # .\ffmpeg -re -stream_loop -1 -i vehicle_vid_12.mp4 -c:v copy -rtsp_transport tcp -f rtsp rtsp://localhost:8554/live_stream
+# With --publish the annotated video of every camera is served back on
+# rtsp://localhost:8554/<camera>_annotated (ffmpeg must be on the PATH)
 
 # --- PATH CONFIGURATION ---
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
 TRACKER_CONFIG = os.path.join(ROOT_DIR, "config", "my_tracker.yaml")
-RTSP_URL = "rtsp://localhost:8554/live_stream"
-VIDEO_FILE_PATH = os.path.join(ROOT_DIR, "tools", "vehicle_vid_12.mp4")
-VIDEO_SOURCE = RTSP_URL
-
-# --- VALIDATION ---
-if not os.path.exists(MODEL_PATH):
-    print(f"[ERROR] Model not found at: {MODEL_PATH}")
-    sys.exit(1)
- 
-# --- VISUALIZATION CONFIG ---
-POLYGON_ROI = np.array([[436, 419], [1919, 422], [1916, 651], [197, 651]], dtype=np.int32)
-ROI_COLOR = (255, 0, 0)
-ROI_ALPHA = 0.3
-TEXT_COLOR = (255, 255, 255)
-TEXT_COUNTED_COLOR = (0, 0, 255) # Red color for counted vehicles
-DEFAULT_COLOR = (255, 255, 255)
-
-CLASS_COLOR_MAP = {
-    'car': (0, 255, 0),
-    'bus': (255, 0, 0),
-    'truck': (0, 51, 102),
-    'motor': (0, 255, 255)
-}
-
-# --- THREADED VIDEO CAPTURE ---
-class VideoCaptureThreading:
-    def __init__(self, src):
-        self.src = src
-        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
-        self.cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
-        
-        if not self.cap.isOpened():
-            print(f"[ERROR] Failed to open connection to: {src}")
-            return
-        
-        self.q = queue.Queue(maxsize=10)
-        self.stop_event = threading.Event()
-        self.t = threading.Thread(target=self._reader)
-        self.t.daemon = True
-        self.t.start()
-
-    def _reader(self):
-        while not self.stop_event.is_set():
-            ret, frame = self.cap.read()
-            if not ret:
-                time.sleep(0.01)
-                continue
-            
-            if not self.q.empty():
-                try: self.q.get_nowait()
-                except queue.Empty: pass
-            self.q.put(frame)
-
-    def read(self):
-        try: 
-            # Wait a bit longer for RTSP packets
-            return True, self.q.get(timeout=1)
-        except queue.Empty:
-            return False, None
-
-    def release(self):
-        self.stop_event.set()
-        self.t.join()
-        self.cap.release()
+CAMERAS_CONFIG = os.path.join(ROOT_DIR, "config", "cameras.yaml")
+ROI_LIST_PATH = os.path.join(ROOT_DIR, "config", "roi-list.txt")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "runs", "counting")
+COUNTS_DB_PATH = os.path.join(OUTPUT_DIR, "counts.db")
+REPORT_PATH = os.path.join(OUTPUT_DIR, "report.txt")
+
+# --- INFERENCE CONFIG ---
+CONF_THRESHOLD = 0.25
+DETECTOR_BACKEND = 'torch'   # 'torch', 'onnx', 'openvino' or 'openvino-int8'
+DISPLAY_WIDTH = 1280
+WINDOW_NAME = "Traffic Monitoring System"
+RENDER_MODE = 'display'   # 'source', 'display' or 'headless'
+CROP_INFERENCE = False    # detect only the area around each camera's zones/lines
+CROP_MARGIN = 64          # pixels kept around the zones/lines bounding rectangle
+MOTION_GATE = False       # skip detection while nothing moves inside the ROI
+REDETECT_INTERVAL = 15    # motion gate: frames between forced detections
+CAPTURE_PROCESSES = False # decode every camera in its own process (shared-memory frame ring)
+WARMUP = True             # run the detector on a dummy batch while the streams connect
+FIRST_FRAME_TIMEOUT = 10.0
+
+# --- PUBLISH CONFIG ---
+# Annotated frames are encoded by one ffmpeg process per camera and published
+# on MediaMTX; frames are dropped when the encoder falls behind
+PUBLISH_STREAMS = False
+PUBLISH_WIDTH = 1280
+PUBLISH_FPS = 15
+
+# --- ADAPTIVE QUALITY CONFIG ---
+# The controller trades input size, frame stride and confidence for latency
+ADAPTIVE_QUALITY = False
+LATENCY_BUDGET_MS = 300   # target capture-to-count latency per camera (p95)
+MIN_IMGSZ = 320
+MAX_STRIDE = 3
+MAX_CONF = 0.4
+
+# --- PIPELINE CONFIG ---
+# Drop policies: 'block', 'drop_oldest', 'drop_newest'
+PIPELINE_QUEUE_SIZE = 8
+COUNT_QUEUE_POLICY = 'block'          # counting must see every tracked frame
+RENDER_QUEUE_POLICY = 'drop_oldest'   # rendering may skip frames to keep up
+DISPLAY_QUEUE_POLICY = 'drop_oldest'
+PIPELINE_STATS_INTERVAL = 5.0
+
+# --- METRICS CONFIG ---
+# Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics (port 0 disables it)
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108
+
+# --- OFFLINE CONFIG ---
+OFFLINE_WORKERS = 1
+OFFLINE_BATCH_SIZE = 16
+
+# --- PERSISTENCE CONFIG ---
+COUNT_BUCKET_SECONDS = 60     # counts are aggregated per camera/zone/line/class per bucket
+COUNT_FLUSH_INTERVAL = 5.0    # seconds between batched writes (max data lost on a crash)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multi-camera vehicle counting")
+    parser.add_argument("--render", choices=render.RENDER_MODES, default=RENDER_MODE,
+                        help="'headless' skips drawing and display and only logs counts/events")
+    parser.add_argument("--backend", choices=BACKENDS, default=DETECTOR_BACKEND,
+                        help="detector runtime; non-torch backends need tools/export_backends.py first")
+    parser.add_argument("--crop", action="store_true", default=CROP_INFERENCE,
+                        help="run the detector only on the bounding rectangle of each camera's zones/lines")
+    parser.add_argument("--crop-margin", type=int, default=CROP_MARGIN,
+                        help="pixels kept around the zones/lines when --crop is set")
+    parser.add_argument("--motion-gate", action="store_true", default=MOTION_GATE,
+                        help="skip detection on frames without motion in the ROI, tracks are predicted instead")
+    parser.add_argument("--redetect-interval", type=int, default=REDETECT_INTERVAL,
+                        help="motion gate: run the detector at least every N frames")
+    parser.add_argument("--capture-processes", action="store_true", default=CAPTURE_PROCESSES,
+                        help="decode each camera in a separate process; frames are shared without copying")
+    parser.add_argument("--publish", action="store_true", default=PUBLISH_STREAMS,
+                        help="publish each camera's annotated video on MediaMTX (also in headless mode)")
+    parser.add_argument("--publish-width", type=int, default=PUBLISH_WIDTH,
+                        help="width of the published streams, height follows the aspect ratio")
+    parser.add_argument("--publish-fps", type=float, default=PUBLISH_FPS,
+                        help="frame rate of the published streams")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", default=WARMUP,
+                        help="skip the detector warm-up on a dummy batch before the first frame")
+    parser.add_argument("--adaptive", action="store_true", default=ADAPTIVE_QUALITY,
+                        help="lower input size / frame rate / confidence when latency exceeds the budget")
+    parser.add_argument("--latency-budget", type=float, default=LATENCY_BUDGET_MS,
+                        help="adaptive mode: p95 capture-to-count latency target in ms")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on this local port (0 disables)")
+    parser.add_argument("--offline", action="store_true",
+                        help="process every video-file camera completely (no frame dropping, batched detection)")
+    parser.add_argument("--workers", type=int, default=OFFLINE_WORKERS,
+                        help="offline mode: detect video segments in this many processes")
+    parser.add_argument("--batch", type=int, default=OFFLINE_BATCH_SIZE,
+                        help="offline mode: frames per detector call")
+    args = parser.parse_args()
+    args.crop_margin = args.crop_margin if args.crop else None
+    args.redetect_interval = max(1, args.redetect_interval) if args.motion_gate else None
+    return args
+
+def run_offline(args, detector, camera_configs):
+    files = [cfg for cfg in camera_configs if cfg.is_file]
+    for cfg in camera_configs:
+        if not cfg.is_file:
+            print(f"[WARNING] [{cfg.name}] Skipped in offline mode, not a video file: {cfg.source}")
+    if not files:
+        print("[ERROR] No video-file cameras to process.")
+        return
+
+    runner = OfflineRunner(detector, load_tracker_args(TRACKER_CONFIG), args.batch, args.workers, args.crop_margin)
+    count_store = CountStore(COUNTS_DB_PATH, COUNT_BUCKET_SECONDS, COUNT_FLUSH_INTERVAL)
+    start_time = time.time()
+    cameras = []
+    try:
+        for cfg in files:
+            print(f"[INFO] [{cfg.name}] Offline processing: {cfg.source}")
+            cameras.append(runner.run(cfg, detector.names, count_store, start_time))
+    finally:
+        count_store.close()
+        write_report(REPORT_PATH, cameras, time.time() - start_time)
+        for cam in cameras:
+            print(f"[INFO] [{cam.name}] Final counts: {cam.counter.vehicle_counts}")
+        print(f"[INFO] Report saved to: {REPORT_PATH}")
+
+def log_events(result):
+    name = result.camera.name
+    for event in result.events:
+        target = f"{event.kind} '{event.name}'" + (f" {event.direction}" if event.direction else "")
+        print(f"[EVENT] [{name}] {target}: ID:{event.track_id} {event.cls_name}")
+
+def check_paths():
+    # Fails early, before anything heavy is imported or loaded
+    if not os.path.exists(MODEL_PATH):
+        print(f"[ERROR] Model not found at: {MODEL_PATH}")
+        return False
+    return True
 
 def main():
-    print(f"[INFO] Loading model: {MODEL_PATH}")
+    startup = StartupClock()
+    args = parse_args()
+    headless = args.render == 'headless'
+
+    if not check_paths():
+        sys.exit(1)
     try:
-        model = YOLO(MODEL_PATH)
+        camera_configs = load_cameras(CAMERAS_CONFIG, ROI_LIST_PATH, ROOT_DIR)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[ERROR] Invalid camera config: {e}")
+        return
+
+    print(f"[INFO] Loading model: {MODEL_PATH} (backend: {args.backend})")
+    try:
+        detector = Detector(MODEL_PATH, conf=CONF_THRESHOLD, backend=args.backend)
     except Exception as e:
         print(f"[ERROR] Load model failed: {e}")
         return
+    startup.mark("model loaded")
+
+    if args.offline:
+        run_offline(args, detector, camera_configs)
+        return
 
-    CLASS_NAMES = model.names
-    vehicle_counts = {name: 0 for name in CLASS_NAMES.values()}
-    id_da_dem = set()
-
-    print(f"[INFO] Connecting to: {VIDEO_SOURCE}")
-    cap = VideoCaptureThreading(VIDEO_SOURCE)
-    
-    print("[INFO] Waiting for stream buffer...")
-    time.sleep(2.0)
-
-    # --- RETRY LOGIC FOR FIRST FRAME ---
-    sample = None
-    for i in range(10):
-        ret, sample = cap.read()
-        if sample is not None:
-            break
-        print(f"[WARNING] Waiting for stream data... ({i+1}/10)")
-        time.sleep(1.0)
-        
-    if sample is None:
+    engine = MultiCameraEngine(detector, camera_configs, TRACKER_CONFIG, args.crop_margin,
+                               args.redetect_interval, args.capture_processes)
+    print(f"[INFO] Serving {len(engine.cameras)} camera(s) with one shared model.")
+
+    metrics = None
+    metrics_server = None
+    if args.metrics_port:
+        registry = MetricsRegistry()
+        metrics = CountingMetrics(registry, engine, startup)
+        metrics_server = MetricsServer(registry, METRICS_HOST, args.metrics_port)
+        try:
+            metrics_server.start()
+            print(f"[INFO] Metrics on http://{METRICS_HOST}:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"[WARNING] Metrics endpoint disabled, port {args.metrics_port} unavailable: {e}")
+            metrics_server = None
+
+    # --- STARTUP ---
+    # Streams connect in the background while the detector is warmed up, so
+    # the first real frame does not pay the model's lazy initialization
+    engine.open(metrics)
+    if args.warmup:
+        seconds = detector.warmup(batch=len(engine.cameras))
+        print(f"[INFO] Detector warm-up: {seconds * 1000:.0f}ms")
+        startup.mark("warm-up done")
+
+    if not engine.wait_for_frames(FIRST_FRAME_TIMEOUT):
         print("[ERROR] No video feed received.")
         print(" -> Check if Mediamtx is running.")
         print(" -> Check if FFmpeg is pushing video.")
-        cap.release()
+        engine.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
         return
-    
-    # Resize logic
-    orig_h, orig_w = sample.shape[:2]
-    display_w = 1280
-    display_h = int(orig_h * (1280/orig_w))
-
-    print(f"[INFO] Started. Display: {display_w}x{display_h}")
-    print("[INFO] Press 'q' to exit.")
-
-    # [FIXED] Create Window explicitly so it appears even if frames are laggy
-    cv2.namedWindow("Traffic Monitoring System", cv2.WINDOW_NORMAL)
-    cv2.resizeWindow("Traffic Monitoring System", display_w, display_h)
-
-    prev_frame_time = 0
-    fps_smoothed = 0
-    alpha_fps = 0.9 
+    startup.mark("first frame")
+
+    controller = None
+    if args.adaptive:
+        levels = build_levels(detector.imgsz, MIN_IMGSZ, MAX_STRIDE, CONF_THRESHOLD, MAX_CONF)
+        controller = QualityController(detector, engine.cameras, args.latency_budget / 1000, levels)
+        print(f"[CONTROL] {len(levels)} quality levels, latency budget {args.latency_budget:.0f}ms")
+
+    publishers = {}
+    if args.publish:
+        for cam in engine.cameras:
+            url = f"{PUBLISH_URL}/{stream_path(cam.name)}"
+            publishers[cam.name] = StreamPublisher(cam.name, url, args.publish_width, args.publish_fps)
+
+    def extra_stats():
+        lines = engine.capture_stats()
+        for name, publisher in publishers.items():
+            st = publisher.stats()
+            state = "up" if st['connected'] else "DOWN"
+            lines.append(f"[PUBLISH] [{name}] {state} published={st['published']} "
+                         f"dropped={st['dropped']} restarts={st['restarts']}")
+        if controller is not None:
+            lines += controller.stats()
+        return lines
+
+    # --- STAGED PIPELINE ---
+    # inference (capture -> batched detect -> track) -> counting -> render -> display
+    # In headless mode the render stage only logs counting events, unless the
+    # annotated streams are published.
+    pipeline = Pipeline(stats_interval=PIPELINE_STATS_INTERVAL, extra_stats=extra_stats)
+    if metrics is not None:
+        metrics.pipeline = pipeline
+
+    def inference_stage():
+        if not engine.running():
+            return None
+        return engine.infer()
+
+    count_store = CountStore(COUNTS_DB_PATH, COUNT_BUCKET_SECONDS, COUNT_FLUSH_INTERVAL)
+    start_time = time.time()
+
+    def counting_stage(result):
+        t0 = time.perf_counter()
+        engine.count(result)
+        startup.counted(result.camera.name)
+        count_store.record(result.camera.name, result.timestamp, result.events)
+        if metrics is not None:
+            metrics.observe_inference(result)
+            metrics.observe_count(result, time.perf_counter() - t0)
+        if controller is not None:
+            controller.observe(result)
+        return [result]
+
+    pipeline.add_source("inference", inference_stage)
+    pipeline.add_stage("count", counting_stage, PIPELINE_QUEUE_SIZE, COUNT_QUEUE_POLICY)
+
+    if headless and not publishers:
+        def output_stage(result):
+            log_events(result)
+            engine.release(result)
+            return []
+
+        pipeline.add_stage("output", output_stage, PIPELINE_QUEUE_SIZE, COUNT_QUEUE_POLICY)
+        display_queue = None
+    else:
+        # Headless publishing draws straight at the stream resolution
+        mode = 'display' if headless else args.render
+        width = args.publish_width if headless else DISPLAY_WIDTH
+        renderers = {
+            cam.name: render.CameraRenderer(cam.polygons, engine.class_names, mode, width,
+                                            [line.points for line in cam.lines])
+            for cam in engine.cameras
+        }
+
+        def render_stage(result):
+            log_events(result)
+            t0 = time.perf_counter()
+            frame_show = renderers[result.camera.name].render(result)
+            if metrics is not None:
+                metrics.observe_render(result, time.perf_counter() - t0)
+            engine.release(result)
+            publisher = publishers.get(result.camera.name)
+            if publisher is not None:
+                publisher.submit(frame_show)
+            return [] if headless else [(result.camera.name, frame_show)]
+
+        pipeline.add_stage("render", render_stage, PIPELINE_QUEUE_SIZE, RENDER_QUEUE_POLICY)
+        display_queue = None if headless else pipeline.add_queue("display", PIPELINE_QUEUE_SIZE, DISPLAY_QUEUE_POLICY)
+
+    exit_key = "Ctrl+C" if headless else "'q'"
+    print(f"[INFO] Started in '{args.render}' mode. Press {exit_key} to exit.")
+    pipeline.start()
+    windows = set()
 
     try:
-        while True:
-            ret, frame = cap.read()
-            
-            # [FIXED] Handle empty frames without exiting
-            if not ret or frame is None:
-                # If it's a local file, we stop. If RTSP, we wait.
-                if isinstance(VIDEO_SOURCE, str) and os.path.exists(VIDEO_SOURCE) and os.path.isfile(VIDEO_SOURCE):
-                    print("[INFO] End of file.")
-                    break
-                
-                # For RTSP, just log and continue waiting
-                print("[WARNING] Frame buffer empty, waiting for stream...")
-                time.sleep(0.1)
-                
-                # Keep window open and responsive even when no frame
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                continue
-
-            # --- 1. TRACKING ---
-            results = model.track(frame, persist=True, tracker=TRACKER_CONFIG, verbose=False, conf=0.25)
-
-            frame_width = frame.shape[1]
-            frame_height = frame.shape[0]
-
-            font_scale = max(0.5, frame_width / 1500)
-            line_height = int(font_scale * 40)
-
-            # --- 2. DRAW ROI ---
-            overlay = frame.copy()
-            cv2.fillPoly(overlay, [POLYGON_ROI], ROI_COLOR)
-            cv2.polylines(overlay, [POLYGON_ROI], isClosed=True, color=ROI_COLOR, thickness=2)
-            cv2.addWeighted(overlay, ROI_ALPHA, frame, 1 - ROI_ALPHA, 0, dst=frame)
-
-            # --- 3. DRAW TRACKING ---
-            if results[0].boxes.id is not None:
-                boxes = results[0].boxes.xyxy.cpu().numpy()
-                ids = results[0].boxes.id.int().cpu().tolist()
-                clss = results[0].boxes.cls.int().cpu().tolist()
-
-                for box, track_id, cls in zip(boxes, ids, clss):
-                    x1, y1, x2, y2 = box
-                    cls_name = CLASS_NAMES.get(cls, str(cls))
-
-                    cx, cy = int((x1 + x2)/2), int(y2)
-                    is_inside = cv2.pointPolygonTest(POLYGON_ROI, (cx, cy), False)
-
-                    if is_inside > 0:
-                        if track_id not in id_da_dem:
-                            id_da_dem.add(track_id)
-                            if cls_name in vehicle_counts:
-                                vehicle_counts[cls_name] += 1
-                    
-                    box_color = CLASS_COLOR_MAP.get(cls_name, DEFAULT_COLOR)
-                    text_draw_color = box_color
-                    
-                    if track_id in id_da_dem and is_inside > 0:
-                        text_draw_color = TEXT_COUNTED_COLOR
-
-                    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), box_color, 2)
-                    label = f"ID:{track_id} {cls_name}"
-                    cv2.putText(frame, label, (int(x1), int(y1)-10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, text_draw_color, 2)
-
-            # --- 4. DASHBOARD ---
-            # FPS
-            curr_time = time.time()
-            fps_instant = 1 / (curr_time - prev_frame_time) if prev_frame_time > 0 else 0
-            prev_frame_time = curr_time
-            fps_smoothed = (alpha_fps * fps_smoothed) + ((1 - alpha_fps) * fps_instant)
-            
-            fps_text = f"FPS: {int(fps_smoothed)}"
-            fps_box_width = int(frame_width * 0.12)
-            
-            overlay_fps = frame.copy()
-            cv2.rectangle(overlay_fps, (0, 0), (fps_box_width, line_height), (0, 0, 0), cv2.FILLED)
-            cv2.addWeighted(overlay_fps, 0.6, frame, 0.4, 0, dst=frame)
-            cv2.putText(frame, fps_text, (int(fps_box_width * 0.1), int(line_height * 0.75)), 
-                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 0), 2)
-
-            # Statistics
-            box_width = int(frame_width * 0.15)
-            start_x = frame_width - box_width
-            num_classes = len(vehicle_counts)
-            box_height = (num_classes * line_height) + int(line_height / 2)
-            
-            overlay_box = frame.copy()
-            cv2.rectangle(overlay_box, (start_x, 0), (frame_width, box_height), (0, 0, 0), cv2.FILLED)
-            cv2.addWeighted(overlay_box, 0.6, frame, 0.4, 0, dst=frame)
-
-            y_off = line_height
-            for k, v in vehicle_counts.items():
-                text = f"{k.capitalize()}: {v}"
-                cv2.putText(frame, text, (start_x + int(box_width*0.1), y_off), 
-                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, 2)
-                y_off += line_height
-
-            # --- 5. REALTIME DISPLAY ---
-            frame_show = cv2.resize(frame, (display_w, display_h))
-            cv2.imshow("Traffic Monitoring System", frame_show)
+        while headless and not pipeline.finished():
+            time.sleep(0.1)
+            pipeline.maybe_print_stats()
+
+        while not headless and not (pipeline.finished() and display_queue.empty()):
+            ret, item = display_queue.get(timeout=0.01)
+            if ret:
+                name, frame_show = item
+                window = f"{WINDOW_NAME} - {name}"
+                if window not in windows:
+                    windows.add(window)
+                    # Create Window explicitly so it appears even if frames are laggy
+                    cv2.namedWindow(window, cv2.WINDOW_NORMAL)
+                    cv2.resizeWindow(window, frame_show.shape[1], frame_show.shape[0])
+                    print(f"[INFO] [{name}] Display: {frame_show.shape[1]}x{frame_show.shape[0]}")
+                cv2.imshow(window, frame_show)
+
+            pipeline.maybe_print_stats()
 
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
@@ -238,9 +339,21 @@ def main():
     except KeyboardInterrupt:
         pass
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        pipeline.stop()
+        for publisher in publishers.values():
+            publisher.stop()
+        engine.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if not headless:
+            cv2.destroyAllWindows()
+        count_store.close()
+        write_report(REPORT_PATH, engine.cameras, time.time() - start_time)
+        for cam in engine.cameras:
+            print(f"[INFO] [{cam.name}] Final counts: {cam.counter.vehicle_counts}")
+        print(f"[INFO] Counts saved to: {COUNTS_DB_PATH}")
+        print(f"[INFO] Report saved to: {REPORT_PATH}")
         print("\n[INFO] System terminated.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
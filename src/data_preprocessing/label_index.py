@@ -0,0 +1,166 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+DATASET_ROOT_DIR = os.path.join(project_root, "datasets")
+SPLITS = ['train', 'valid', 'test']
+CACHE_FILENAME = ".label_index.pkl"
+CACHE_VERSION = 1
+
+EXPECTED_VALUES_FOR_BBOX = 5
+CHUNK_SIZE = 256          # label files per worker task
+MIN_PARALLEL_FILES = 1024  # below this, parsing in-process is faster than starting workers
+
+
+# --- LABEL FILE PARSING ---
+# One record per file: the class index of every annotation line (None if the
+# class is not an integer), whether any line looks like a polygon (more than
+# class x y w h) and whether the file could be read at all.
+def parse_label_file(path):
+    record = {'classes': [], 'polygon': False, 'error': None}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                if len(parts) > EXPECTED_VALUES_FOR_BBOX:
+                    record['polygon'] = True
+                try:
+                    record['classes'].append(int(parts[0]))
+                except ValueError:
+                    record['classes'].append(None)
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def _parse_chunk(paths):
+    return [parse_label_file(path) for path in paths]
+
+
+# --- LABEL INDEX ---
+# Scans datasets/{train,valid,test}/labels once into a shared index that is
+# cached next to the dataset. Files whose mtime and size are unchanged are
+# taken from the cache; new or modified files are parsed across all cores.
+class LabelIndex:
+    def __init__(self, root_dir=DATASET_ROOT_DIR, splits=SPLITS, cache_path=None):
+        self.root_dir = root_dir
+        self.splits = splits
+        self.cache_path = cache_path or os.path.join(root_dir, CACHE_FILENAME)
+        # rel path -> (split, mtime_ns, size, record)
+        self.entries = {}
+
+    def load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: ignoring unreadable label cache {self.cache_path}: {e}")
+            return {}
+        if data.get('version') != CACHE_VERSION:
+            return {}
+        return data['entries']
+
+    def save_cache(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'entries': self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def labels_dir(self, split):
+        return os.path.join(self.root_dir, split, 'labels')
+
+    def _list_files(self):
+        for split in self.splits:
+            label_dir = self.labels_dir(split)
+            if not os.path.isdir(label_dir):
+                continue
+            with os.scandir(label_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".txt") and entry.is_file():
+                        st = entry.stat()
+                        rel_path = os.path.join(split, 'labels', entry.name)
+                        yield split, rel_path, st.st_mtime_ns, st.st_size
+
+    def refresh(self, workers=None):
+        # Returns (parsed, cached, removed) file counts
+        cached = self.load_cache()
+        entries = {}
+        stale = []
+        for split, rel_path, mtime_ns, size in self._list_files():
+            old = cached.get(rel_path)
+            # Unreadable files are retried on every refresh
+            if old is not None and old[1] == mtime_ns and old[2] == size and old[3]['error'] is None:
+                entries[rel_path] = old
+            else:
+                stale.append((split, rel_path, mtime_ns, size))
+
+        paths = [os.path.join(self.root_dir, rel_path) for _, rel_path, _, _ in stale]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(paths) >= MIN_PARALLEL_FILES:
+            chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                records = [record for chunk in pool.map(_parse_chunk, chunks) for record in chunk]
+        else:
+            records = _parse_chunk(paths)
+
+        for (split, rel_path, mtime_ns, size), record in zip(stale, records):
+            entries[rel_path] = (split, mtime_ns, size, record)
+
+        removed = len(set(cached) - set(entries))
+        self.entries = entries
+        if stale or removed or not os.path.exists(self.cache_path):
+            self.save_cache()
+        return len(stale), len(entries) - len(stale), removed
+
+    def forget(self, paths):
+        # Drops files from the index and cache, e.g. after rewriting them: a
+        # rewrite of the same size within one mtime tick would look unchanged
+        for path in paths:
+            self.entries.pop(os.path.relpath(path, self.root_dir), None)
+        self.save_cache()
+
+    # --- QUERIES ---
+    def files(self, split=None):
+        # (absolute path, record) of every label file, optionally for one split
+        for rel_path, (file_split, _, _, record) in sorted(self.entries.items()):
+            if split is None or file_split == split:
+                yield os.path.join(self.root_dir, rel_path), record
+
+    def polygon_files(self):
+        return [path for path, record in self.files() if record['polygon']]
+
+    def unreadable_files(self):
+        return [(path, record['error']) for path, record in self.files() if record['error']]
+
+    def class_counts(self, split, class_names):
+        # Same rules as before: lines with an integer class in range are counted
+        counts = {name: 0 for name in class_names}
+        files = 0
+        for _, record in self.files(split):
+            if record['error']:
+                continue
+            files += 1
+            for cls in record['classes']:
+                if cls is not None and 0 <= cls < len(class_names):
+                    counts[class_names[cls]] += 1
+        return counts, files
+
+    def relabel_preview(self, split, index_map):
+        # Files and annotations a class remap would change, without touching them
+        files = []
+        annotations = 0
+        for path, record in self.files(split):
+            changed = sum(1 for cls in record['classes'] if cls in index_map)
+            if changed:
+                files.append(path)
+                annotations += changed
+        return files, annotations
+
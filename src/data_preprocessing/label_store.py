@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+DATASET_ROOT_DIR = os.path.join(project_root, "datasets")
+STORE_ROOT_DIR = os.path.join(DATASET_ROOT_DIR, ".label_store")
+CLASS_NAMES = ['bus', 'car', 'motor', 'truck']
+SPLITS = ['train', 'valid', 'test']
+EXPORT_DIRNAME = "labels_exported"   # default export target, next to the split's labels/
+
+# Columns of the box array
+IMAGE, CLS, CX, CY, W, H = range(6)
+CHUNK_SIZE = 256
+MIN_PARALLEL_FILES = 1024
+SIZE_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# --- PARSING ---
+# Every line becomes (class, cx, cy, w, h). Polygon lines (class x1 y1 x2 y2
+# ...) are reduced to their bounding box, the same thing YOLO does when it
+# trains a detector on them. Lines that do not parse are skipped and counted.
+def parse_label_file(path):
+    rows = []
+    skipped = polygons = 0
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                values = [float(v) for v in parts]
+            except ValueError:
+                skipped += 1
+                continue
+            if len(values) == 5:
+                rows.append(values)
+            elif len(values) > 5 and len(values) % 2 == 1:
+                xs, ys = values[1::2], values[2::2]
+                x1, x2, y1, y2 = min(xs), max(xs), min(ys), max(ys)
+                rows.append([values[0], (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+                polygons += 1
+            else:
+                skipped += 1
+    return np.array(rows, dtype=np.float32).reshape(-1, 5), skipped, polygons
+
+
+def format_value(value):
+    # Shortest text that reads back as the same float32 ("0.5", "0.4921875")
+    return np.format_float_positional(value, unique=True, trim='-')
+
+
+def _parse_chunk(paths):
+    return [parse_label_file(path) for path in paths]
+
+
+# --- LABEL STORE ---
+# A whole split in three files:
+#   boxes.npy   (N, 6) float32, memory-mapped: image index, class, cx, cy, w, h
+#   offsets.npy (images + 1,) int64: boxes of image i are boxes[offsets[i]:offsets[i+1]]
+#   files.txt   label file name of every image, in image index order
+#   meta.json   lines reduced from polygons and lines skipped while packing
+# Images without boxes keep an empty slice, so exporting restores every file.
+# Exporting is lossy if polygons were reduced or lines skipped, and values are
+# written back as float32, so it never targets the original labels by default.
+class LabelStore:
+    def __init__(self, store_dir, mode='r'):
+        self.store_dir = store_dir
+        self.boxes = np.load(os.path.join(store_dir, "boxes.npy"), mmap_mode=mode)
+        self.offsets = np.load(os.path.join(store_dir, "offsets.npy"))
+        with open(os.path.join(store_dir, "files.txt"), 'r') as f:
+            self.files = f.read().splitlines()
+        try:
+            with open(os.path.join(store_dir, "meta.json"), 'r') as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = None
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def classes(self):
+        return self.boxes[:, CLS].astype(np.int64)
+
+    def image_boxes(self, index):
+        return self.boxes[self.offsets[index]:self.offsets[index + 1]]
+
+    def class_histogram(self, num_classes):
+        classes = self.classes
+        valid = (classes >= 0) & (classes < num_classes)
+        return np.bincount(classes[valid], minlength=num_classes)
+
+    def box_size_stats(self, image_size=640):
+        # Width, height and sqrt(area) in pixels at the training image size
+        w = self.boxes[:, W] * image_size
+        h = self.boxes[:, H] * image_size
+        sizes = {'width': w, 'height': h, 'sqrt_area': np.sqrt(w * h)}
+        return {name: np.percentile(values, SIZE_PERCENTILES) if len(values) else np.zeros(len(SIZE_PERCENTILES))
+                for name, values in sizes.items()}
+
+    def remap(self, index_map):
+        # In place, one lookup over all boxes; classes not in index_map stay
+        if self.boxes.mode != 'r+':
+            raise ValueError("Open the store with mode='r+' to remap classes")
+        classes = self.classes
+        lut = np.arange(max(classes.max(initial=0), max(index_map, default=0)) + 1)
+        for old, new in index_map.items():
+            lut[old] = new
+        valid = classes >= 0
+        changed = valid & (lut[np.where(valid, classes, 0)] != classes)
+        self.boxes[changed, CLS] = lut[classes[changed]]
+        self.boxes.flush()
+        return int(changed.sum())
+
+    def export(self, labels_dir):
+        # Back to YOLO text files, one per image
+        os.makedirs(labels_dir, exist_ok=True)
+        for i, name in enumerate(self.files):
+            rows = self.image_boxes(i)
+            with open(os.path.join(labels_dir, name), 'w') as f:
+                for row in rows:
+                    coords = " ".join(format_value(v) for v in row[CX:])
+                    f.write(f"{int(row[CLS])} {coords}\n")
+        return len(self.files)
+
+
+def pack_split(labels_dir, store_dir, workers=None):
+    names = sorted(name for name in os.listdir(labels_dir) if name.endswith(".txt"))
+    paths = [os.path.join(labels_dir, name) for name in names]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) >= MIN_PARALLEL_FILES:
+        chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = [item for chunk in pool.map(_parse_chunk, chunks) for item in chunk]
+    else:
+        parsed = _parse_chunk(paths)
+
+    counts = np.array([len(rows) for rows, _, _ in parsed], dtype=np.int64)
+    offsets = np.zeros(len(parsed) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    os.makedirs(store_dir, exist_ok=True)
+    boxes_path = os.path.join(store_dir, "boxes.npy")
+    boxes = np.lib.format.open_memmap(boxes_path + ".tmp.npy", mode='w+', dtype=np.float32,
+                                      shape=(int(offsets[-1]), 6))
+    for i, (rows, _, _) in enumerate(parsed):
+        boxes[offsets[i]:offsets[i + 1], IMAGE] = i
+        boxes[offsets[i]:offsets[i + 1], CLS:] = rows
+    boxes.flush()
+    del boxes
+    os.replace(boxes_path + ".tmp.npy", boxes_path)
+
+    np.save(os.path.join(store_dir, "offsets.npy"), offsets)
+    with open(os.path.join(store_dir, "files.txt"), 'w') as f:
+        f.write("\n".join(names) + ("\n" if names else ""))
+
+    skipped = sum(s for _, s, _ in parsed)
+    polygons = sum(p for _, _, p in parsed)
+    with open(os.path.join(store_dir, "meta.json"), 'w') as f:
+        json.dump({'skipped': skipped, 'polygons': polygons}, f)
+    return len(names), int(offsets[-1]), skipped, polygons
+
+
+# --- COMMAND LINE ---
+def parse_index_map(text):
+    # "0:2,2:0" -> {0: 2, 2: 0}
+    index_map = {}
+    for pair in text.split(','):
+        old, new = pair.split(':')
+        index_map[int(old)] = int(new)
+    return index_map
+
+
+def print_stats(split, store):
+    hist = store.class_histogram(len(CLASS_NAMES))
+    print(f"\n--- {split.upper()}: {len(store)} images, {len(store.boxes)} boxes ---")
+    for name, count in zip(CLASS_NAMES, hist):
+        print(f"{name:<10}{count:>10}")
+    print(f"{'PERCENTILE':<12}" + "".join(f"{f'P{p}':>9}" for p in SIZE_PERCENTILES))
+    for name, values in store.box_size_stats().items():
+        print(f"{name:<12}" + "".join(f"{v:>9.1f}" for v in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack YOLO label files into a memory-mapped store")
+    parser.add_argument("command", choices=('pack', 'stats', 'remap', 'export'))
+    parser.add_argument("--split", nargs="+", default=SPLITS)
+    parser.add_argument("--map", help="remap: class index map, e.g. 0:2,2:0")
+    parser.add_argument("--out", help=f"export: target directory, one subfolder per split "
+                                      f"(default: <split>/{EXPORT_DIRNAME})")
+    parser.add_argument("--force", action="store_true",
+                        help="export even if the store is lossy or the target is the original labels folder")
+    args = parser.parse_args()
+
+    for split in args.split:
+        labels_dir = os.path.join(DATASET_ROOT_DIR, split, 'labels')
+        store_dir = os.path.join(STORE_ROOT_DIR, split)
+
+        if args.command == 'pack':
+            if not os.path.isdir(labels_dir):
+                print(f"Skipping {split}: {labels_dir} not found.")
+                continue
+            images, boxes, skipped, polygons = pack_split(labels_dir, store_dir)
+            print(f"Packed {split}: {images} images, {boxes} boxes -> {store_dir}")
+            if polygons:
+                print(f"  {polygons} polygon line(s) reduced to bounding boxes")
+            if skipped:
+                print(f"  {skipped} unparseable line(s) skipped")
+            continue
+
+        if not os.path.isdir(store_dir):
+            print(f"Skipping {split}: no store at {store_dir}, run 'pack' first.")
+            continue
+
+        if args.command == 'stats':
+            print_stats(split, LabelStore(store_dir))
+        elif args.command == 'remap':
+            if not args.map:
+                parser.error("remap needs --map")
+            changed = LabelStore(store_dir, mode='r+').remap(parse_index_map(args.map))
+            print(f"Remapped {split}: {changed} box(es) changed. Run 'export' to write the text labels.")
+        else:
+            store = LabelStore(store_dir)
+            out_dir = (os.path.join(args.out, split) if args.out
+                       else os.path.join(DATASET_ROOT_DIR, split, EXPORT_DIRNAME))
+            problems = []
+            if store.meta is None:
+                problems.append("store has no meta.json, polygon/skipped line counts unknown (re-run 'pack')")
+            else:
+                if store.meta['polygons']:
+                    problems.append(f"{store.meta['polygons']} polygon line(s) would be written as bounding boxes")
+                if store.meta['skipped']:
+                    problems.append(f"{store.meta['skipped']} unparseable line(s) would be dropped")
+            if os.path.abspath(out_dir) == os.path.abspath(labels_dir):
+                problems.append("target is the original labels folder, values are rewritten as float32")
+            if problems:
+                print(f"{'Warning' if args.force else 'Error'}: exporting {split} loses data:")
+                for problem in problems:
+                    print(f"  {problem}")
+                if not args.force:
+                    print("  Use --force to export anyway.")
+                    continue
+            written = store.export(out_dir)
+            print(f"Exported {split}: {written} label files -> {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
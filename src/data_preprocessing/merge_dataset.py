@@ -1,64 +1,301 @@
-import os
-import shutil
-
-current_file = os.path.abspath(__file__)
-current_dir = os.path.dirname(current_file)
-project_root = os.path.dirname(os.path.dirname(current_dir))
-raw_data_path = os.path.join(project_root, "assets", "raw_data_sample")
-
-SOURCE_DATASET_DIRS = raw_data_path
-
-OUTPUT_DIR = os.path.join(project_root, "datasets")
-
-def merge_datasets_with_renaming():
-    print(f"--- Starting merge process into: {OUTPUT_DIR} ---")
-
-    # Create output directories
-    for split in ['train', 'valid', 'test']:
-        os.makedirs(os.path.join(OUTPUT_DIR, split, 'images'), exist_ok=True)
-        os.makedirs(os.path.join(OUTPUT_DIR, split, 'labels'), exist_ok=True)
-
-    for source_dir in SOURCE_DATASET_DIRS:
-        dataset_name = os.path.basename(os.path.normpath(source_dir))
-        print(f"\nProcessing source dataset: '{dataset_name}'...")
-        
-        if not os.path.exists(source_dir):
-             print(f"Warning: Source path not found: {source_dir}")
-             continue
-
-        for split in ['train', 'valid', 'test']:
-            src_image_dir = os.path.join(source_dir, split, 'images')
-            src_label_dir = os.path.join(source_dir, split, 'labels')
-
-            if not os.path.exists(src_image_dir):
-                print(f"  - Skipping split '{split}' (images folder not found).")
-                continue
-            
-            file_counter = 1
-            # Get sorted list of files
-            sorted_filenames = sorted([f for f in os.listdir(src_image_dir) if os.path.isfile(os.path.join(src_image_dir, f))])
-
-            for filename in sorted_filenames:
-                base_name = os.path.splitext(filename)[0]
-                ext = os.path.splitext(filename)[1]
-                
-                new_basename = f"{dataset_name}_{file_counter:05d}"
-                new_filename = new_basename + ext
-
-                src_img_path = os.path.join(src_image_dir, filename)
-                src_label_path = os.path.join(src_label_dir, base_name + ".txt")
-                
-                dst_img_path = os.path.join(OUTPUT_DIR, split, 'images', new_filename)
-                dst_label_path = os.path.join(OUTPUT_DIR, split, 'labels', new_basename + ".txt")
-                
-                shutil.copy2(src_img_path, dst_img_path)
-
-                if os.path.exists(src_label_path):
-                    shutil.copy2(src_label_path, dst_label_path)
-                
-                file_counter += 1
-    
-    print("\n--- DATASET MERGE COMPLETED ---")
-
-if __name__ == '__main__':
-    merge_datasets_with_renaming()
\ No newline at end of file
+import argparse
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+project_root = os.path.dirname(os.path.dirname(current_dir))
+raw_data_path = os.path.join(project_root, "assets", "raw_data_sample")
+
+# Every entry is one dataset folder with {train,valid,test}/{images,labels}
+SOURCE_DATASET_DIRS = [raw_data_path]
+
+OUTPUT_DIR = os.path.join(project_root, "datasets")
+SPLITS = ['train', 'valid', 'test']
+MANIFEST_FILENAME = ".merge_manifest.jsonl"
+
+# --- MERGE CONFIG ---
+LINK_MODE = 'auto'        # 'auto' (reflink -> hardlink -> copy), 'reflink', 'hardlink' or 'copy'
+DEDUP_MODE = 'near'       # 'off', 'exact' (same bytes) or 'near' (also near-identical images of another source)
+NEAR_DUP_DISTANCE = 4     # max differing bits of the 64-bit difference hash
+WORKERS = min(16, (os.cpu_count() or 1) * 2)
+HASH_CHUNK = 1 << 20
+
+FICLONE = 0x40049409      # Linux reflink ioctl (btrfs, xfs, ...)
+
+
+# --- CONTENT HASHES ---
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def difference_hash(path):
+    # 64-bit dHash: survives re-encoding, resizing and small brightness changes
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+class NearDuplicateIndex:
+    # Two hashes within NEAR_DUP_DISTANCE (< 8) bits share at least one of
+    # their 8 bytes, so only images with a matching byte are compared.
+    # Only images of other sources match: within one dataset, near-identical
+    # images are usually consecutive video frames with their own labels.
+    def __init__(self, max_distance=NEAR_DUP_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = [{} for _ in range(8)]
+
+    def find(self, dhash, source):
+        for band, table in enumerate(self.bands):
+            for other, name, other_source in table.get((dhash >> (8 * band)) & 0xFF, ()):
+                if other_source != source and bin(dhash ^ other).count("1") <= self.max_distance:
+                    return name
+        return None
+
+    def add(self, dhash, name, source):
+        for band, table in enumerate(self.bands):
+            table.setdefault((dhash >> (8 * band)) & 0xFF, []).append((dhash, name, source))
+
+
+def read_label_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return sorted(" ".join(line.split()) for line in f if line.strip())
+
+
+def merged_label_path(dst):
+    # <output>/<split>/images/x.jpg -> <output>/<split>/labels/x.txt
+    image_dir, filename = os.path.split(dst)
+    return os.path.join(os.path.dirname(image_dir), 'labels', os.path.splitext(filename)[0] + ".txt")
+
+
+# --- LINK / COPY ---
+def reflink(src, dst):
+    import fcntl
+
+    with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+
+
+def place_file(src, dst, mode):
+    # Writes to a temporary name first, so an interrupted run never leaves a
+    # half-written file under the final name. Returns the method used.
+    tmp = dst + ".part"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    methods = ['reflink', 'hardlink', 'copy'] if mode == 'auto' else [mode]
+    for method in methods:
+        try:
+            if method == 'reflink':
+                reflink(src, tmp)
+            elif method == 'hardlink':
+                os.link(src, tmp)
+            else:
+                shutil.copy2(src, tmp)
+            os.replace(tmp, dst)
+            return method
+        except (OSError, ImportError) as e:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            unsupported = isinstance(e, ImportError) or e.errno in (
+                errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY, errno.EMLINK)
+            if method == methods[-1] or not unsupported:
+                raise
+    return None
+
+
+# --- MERGE PLAN ---
+def plan_merge(source_dirs, output_dir):
+    # Same naming as before: <dataset>_<n> numbered per source and split in
+    # sorted file order, so names stay stable when a run is resumed
+    items = []
+    for source_dir in source_dirs:
+        dataset_name = os.path.basename(os.path.normpath(source_dir))
+        print(f"\nProcessing source dataset: '{dataset_name}'...")
+
+        if not os.path.exists(source_dir):
+            print(f"Warning: Source path not found: {source_dir}")
+            continue
+
+        for split in SPLITS:
+            src_image_dir = os.path.join(source_dir, split, 'images')
+            src_label_dir = os.path.join(source_dir, split, 'labels')
+
+            if not os.path.exists(src_image_dir):
+                print(f"  - Skipping split '{split}' (images folder not found).")
+                continue
+
+            sorted_filenames = sorted([f for f in os.listdir(src_image_dir) if os.path.isfile(os.path.join(src_image_dir, f))])
+            for file_counter, filename in enumerate(sorted_filenames, start=1):
+                base_name, ext = os.path.splitext(filename)
+                new_basename = f"{dataset_name}_{file_counter:05d}"
+                items.append({
+                    'source': os.path.abspath(source_dir),
+                    'src': os.path.join(src_image_dir, filename),
+                    'src_label': os.path.join(src_label_dir, base_name + ".txt"),
+                    'dst': os.path.join(output_dir, split, 'images', new_basename + ext),
+                    'dst_label': os.path.join(output_dir, split, 'labels', new_basename + ".txt"),
+                })
+            print(f"  - {split}: {len(sorted_filenames)} images")
+    return items
+
+
+def load_manifest(path):
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted run
+            entries[entry['src']] = entry
+    return entries
+
+
+# --- MERGE ENGINE ---
+# 1. hash every image not merged yet (parallel)
+# 2. decide duplicates in plan order: the first occurrence wins (sequential)
+# 3. link or copy the kept images and their labels (parallel)
+# Each finished image is appended to a manifest in the output folder; a rerun
+# skips everything listed there, so an interrupted merge simply continues.
+def merge_datasets_with_renaming(source_dirs=SOURCE_DATASET_DIRS, output_dir=OUTPUT_DIR,
+                                 link_mode=LINK_MODE, dedup_mode=DEDUP_MODE, workers=WORKERS):
+    print(f"--- Starting merge process into: {output_dir} ---")
+
+    # Create output directories
+    for split in SPLITS:
+        os.makedirs(os.path.join(output_dir, split, 'images'), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, split, 'labels'), exist_ok=True)
+
+    items = plan_merge(source_dirs, output_dir)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    done = load_manifest(manifest_path)
+
+    # Merged images that were deleted from the output since are merged again
+    for src, entry in list(done.items()):
+        if entry.get('duplicate_of') is None and not os.path.exists(entry['dst']):
+            del done[src]
+
+    # Label file of every kept image, to compare against its duplicates
+    exact_seen = {}
+    kept_labels = {}
+    near_index = NearDuplicateIndex()
+    for entry in done.values():
+        if entry.get('duplicate_of') is None and entry.get('sha256'):
+            exact_seen[entry['sha256']] = entry['dst']
+            kept_labels[entry['dst']] = merged_label_path(entry['dst'])
+            if entry.get('dhash') is not None and entry.get('source'):
+                near_index.add(entry['dhash'], entry['dst'], entry['source'])
+
+    pending = [item for item in items if item['src'] not in done]
+    print(f"\n{len(items)} images planned, {len(items) - len(pending)} already merged, {len(pending)} to do.")
+
+    def hash_item(item):
+        if dedup_mode == 'off':
+            return None, None
+        return file_digest(item['src']), difference_hash(item['src']) if dedup_mode == 'near' else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(hash_item, pending))
+
+    manifest = open(manifest_path, 'a')
+    manifest_lock = threading.Lock()
+
+    def record(entry):
+        with manifest_lock:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+    to_place = []
+    duplicates = {'exact': 0, 'near': 0}
+    discarded_labels = 0
+    for item, (sha256, dhash) in zip(pending, hashes):
+        duplicate_of = kind = None
+        if sha256 is not None:
+            if sha256 in exact_seen:
+                duplicate_of, kind = exact_seen[sha256], 'exact'
+            elif dhash is not None:
+                duplicate_of = near_index.find(dhash, item['source'])
+                kind = 'near' if duplicate_of else None
+
+        if duplicate_of is not None:
+            duplicates[kind] += 1
+            entry = {'src': item['src'], 'duplicate_of': duplicate_of, 'kind': kind}
+            # The duplicate's labels are dropped with it; say so if they differ
+            if read_label_lines(item['src_label']) != read_label_lines(kept_labels[duplicate_of]):
+                discarded_labels += 1
+                entry['discarded_label'] = item['src_label']
+                print(f"Warning: {kind} duplicate {item['src']} of {duplicate_of} has different labels, "
+                      f"discarding {item['src_label']}")
+            record(entry)
+            continue
+
+        if sha256 is not None:
+            exact_seen[sha256] = item['dst']
+            kept_labels[item['dst']] = item['src_label']
+            if dhash is not None:
+                near_index.add(dhash, item['dst'], item['source'])
+        to_place.append((item, sha256, dhash))
+
+    methods = {}
+    methods_lock = threading.Lock()
+
+    def place_item(args):
+        item, sha256, dhash = args
+        method = place_file(item['src'], item['dst'], link_mode)
+        # Labels are always copied: a hardlinked label edited in place later
+        # (modify_class.py) would silently change the source dataset too
+        if os.path.exists(item['src_label']):
+            place_file(item['src_label'], item['dst_label'], 'copy')
+        with methods_lock:
+            methods[method] = methods.get(method, 0) + 1
+        record({'src': item['src'], 'source': item['source'], 'dst': item['dst'],
+                'sha256': sha256, 'dhash': dhash, 'method': method})
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(place_item, to_place):
+                pass
+    finally:
+        manifest.close()
+
+    print("\n--- MERGE SUMMARY ---")
+    print(f"Merged: {len(to_place)} images ({', '.join(f'{k}: {v}' for k, v in methods.items()) or 'none'})")
+    print(f"Duplicates skipped: {duplicates['exact']} exact, {duplicates['near']} near-identical across sources")
+    if discarded_labels:
+        print(f"Warning: {discarded_labels} skipped duplicate(s) had labels different from the kept copy "
+              f"(listed as 'discarded_label' in the manifest)")
+    print(f"Manifest: {manifest_path}")
+    print("\n--- DATASET MERGE COMPLETED ---")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge YOLO datasets with renaming, deduplication and resume")
+    parser.add_argument("--sources", nargs="+", default=SOURCE_DATASET_DIRS, help="source dataset folders")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--link", choices=('auto', 'reflink', 'hardlink', 'copy'), default=LINK_MODE)
+    parser.add_argument("--dedup", choices=('off', 'exact', 'near'), default=DEDUP_MODE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    merge_datasets_with_renaming(args.sources, args.output, args.link, args.dedup, args.workers)
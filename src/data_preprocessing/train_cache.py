@@ -0,0 +1,276 @@
+import argparse
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import IMG_FORMATS, exif_size
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+DATASET_ROOT_DIR = os.path.join(project_root, "datasets")
+SPLITS = ['train', 'valid', 'test']
+IMG_SIZE = 640
+CACHE_DIRNAME = ".image_cache"   # next to the split's images/ and labels/
+CACHE_VERSION = 2   # 2: INTER_LINEAR downscaling like the uncached loader
+CHUNK_SIZE = 64
+
+# Columns of index.npy
+OFFSET, H, W, H0, W0 = range(5)
+
+
+# --- CACHE LAYOUT ---
+# <split>/.image_cache/
+#   images.npy  flat uint8 array, memory-mapped; image i is
+#               images[offset:offset + h*w*3].reshape(h, w, 3) (BGR)
+#   index.npy   (N, 5) int64: offset, h, w, original h, original w
+#   files.txt   image file name of every entry
+#   meta.json   cache version, imgsz and (name, mtime, size) of every source image
+# Images are resized once the way YOLODataset.load_image does it (long side
+# to imgsz, aspect kept). Padding is not baked in: the trainer letterboxes and
+# builds mosaics itself, so the normalized labels stay valid as they are and
+# are still read from the split's labels/ folder.
+def cache_dir_for(image_dir):
+    return os.path.join(os.path.dirname(os.path.normpath(image_dir)), CACHE_DIRNAME)
+
+
+def resized_shape(h0, w0, imgsz):
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return h0, w0
+    return min(math.ceil(h0 * r), imgsz), min(math.ceil(w0 * r), imgsz)
+
+
+def source_fingerprint(image_dir):
+    files = []
+    for name in sorted(os.listdir(image_dir)):
+        if name.rpartition('.')[-1].lower() in IMG_FORMATS:
+            st = os.stat(os.path.join(image_dir, name))
+            files.append([name, st.st_mtime_ns, st.st_size])
+    return files
+
+
+def load_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_cache_valid(image_dir, imgsz, files=None):
+    meta = load_meta(cache_dir_for(image_dir))
+    if meta is None or meta.get('version') != CACHE_VERSION or meta.get('imgsz') != imgsz:
+        return False
+    return meta.get('files') == (files if files is not None else source_fingerprint(image_dir))
+
+
+def _image_size(path):
+    # (h, w) after EXIF rotation, from the header only
+    try:
+        with Image.open(path) as im:
+            w, h = exif_size(im)
+        return h, w
+    except Exception:
+        return 0, 0
+
+
+def _fill_chunk(task):
+    images_path, image_dir, entries, imgsz = task
+    images = np.load(images_path, mmap_mode='r+')
+    failed = []
+    for name, offset, h, w in entries:
+        im = cv2.imread(os.path.join(image_dir, name))
+        if im is None:
+            failed.append(name)
+            continue
+        if im.shape[:2] != (h, w):
+            # INTER_LINEAR either way, as YOLODataset.load_image, for identical pixels
+            im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        images[offset:offset + h * w * 3] = im.reshape(-1)
+    images.flush()
+    return failed
+
+
+def build_cache(image_dir, imgsz=IMG_SIZE, workers=None, force=False):
+    # Returns the cache dir; rebuilds only if the images or imgsz changed
+    cache_dir = cache_dir_for(image_dir)
+    files = source_fingerprint(image_dir)
+    if not force and is_cache_valid(image_dir, imgsz, files):
+        return cache_dir
+
+    names = [name for name, _, _ in files]
+    workers = workers or os.cpu_count() or 1
+    paths = [os.path.join(image_dir, name) for name in names]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        original = list(pool.map(_image_size, paths, chunksize=CHUNK_SIZE))
+
+    index = np.zeros((len(names), 5), dtype=np.int64)
+    offset = 0
+    for i, (h0, w0) in enumerate(original):
+        h, w = resized_shape(h0, w0, imgsz) if h0 and w0 else (0, 0)
+        index[i] = (offset, h, w, h0, w0)
+        offset += h * w * 3
+
+    tmp_dir = cache_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    images_path = os.path.join(tmp_dir, "images.npy")
+    np.lib.format.open_memmap(images_path, mode='w+', dtype=np.uint8, shape=(max(offset, 1),)).flush()
+
+    entries = [(name, int(index[i, OFFSET]), int(index[i, H]), int(index[i, W]))
+               for i, name in enumerate(names) if index[i, H]]
+    tasks = [(images_path, image_dir, entries[i:i + CHUNK_SIZE], imgsz) for i in range(0, len(entries), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        failed = set(name for chunk in pool.map(_fill_chunk, tasks) for name in chunk)
+
+    # Unreadable images get an empty slot and are left to the normal loader
+    failed.update(name for i, name in enumerate(names) if not index[i, H])
+    for i, name in enumerate(names):
+        if name in failed:
+            index[i, H:] = 0
+
+    np.save(os.path.join(tmp_dir, "index.npy"), index)
+    with open(os.path.join(tmp_dir, "files.txt"), 'w') as f:
+        f.write("\n".join(names) + ("\n" if names else ""))
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'imgsz': imgsz, 'files': files}, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    if failed:
+        print(f"Warning: {len(failed)} unreadable image(s) in {image_dir} were not cached.")
+    return cache_dir
+
+
+class ImageCache:
+    def __init__(self, cache_dir):
+        self.images = np.load(os.path.join(cache_dir, "images.npy"), mmap_mode='r')
+        self.index = np.load(os.path.join(cache_dir, "index.npy"))
+        with open(os.path.join(cache_dir, "files.txt"), 'r') as f:
+            self.files = f.read().splitlines()
+
+    def __len__(self):
+        return len(self.files)
+
+    def image(self, i):
+        # (BGR image, original (h, w)), or None if the image is not cached
+        offset, h, w, h0, w0 = self.index[i]
+        if not h:
+            return None
+        return self.images[offset:offset + h * w * 3].reshape(h, w, 3), (int(h0), int(w0))
+
+
+# --- TRAINING FROM THE CACHE ---
+# YOLODataset that takes images from the cache instead of decoding the
+# originals. The memmap is opened lazily in each dataloader worker; images
+# missing from the cache fall back to the normal loader.
+class CachedYOLODataset(YOLODataset):
+    def __init__(self, *args, cache_dir=None, **kwargs):
+        self.cache_dir = cache_dir
+        self._image_cache = None
+        self._cache_lookup = None
+        super().__init__(*args, **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_image_cache'] = None  # a pickled memmap would be copied into every worker
+        return state
+
+    def image_cache(self):
+        if self._image_cache is None:
+            self._image_cache = ImageCache(self.cache_dir)
+            cache_files = {name: i for i, name in enumerate(self._image_cache.files)}
+            self._cache_lookup = [cache_files.get(os.path.basename(f)) for f in self.im_files]
+        return self._image_cache
+
+    def load_image(self, i, rect_mode=True):
+        if self.ims[i] is not None or not rect_mode or self.cache_dir is None:
+            return super().load_image(i, rect_mode)
+        cache = self.image_cache()
+        j = self._cache_lookup[i]
+        cached = cache.image(j) if j is not None else None
+        if cached is None:
+            return super().load_image(i, rect_mode)
+
+        im, (h0, w0) = cached
+        im = np.array(im)  # augmentations may modify the image in place
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != "ram":
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, (h0, w0), im.shape[:2]
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    # Builds (or reuses) the image cache of every split it loads
+    def build_dataset(self, img_path, mode="train", batch=None):
+        if not isinstance(img_path, str) or not os.path.isdir(img_path):
+            return super().build_dataset(img_path, mode, batch)
+
+        imgsz = self.args.imgsz
+        if not is_cache_valid(img_path, imgsz):
+            print(f"[INFO] Building {imgsz}px image cache for {img_path}...")
+        cache_dir = build_cache(img_path, imgsz, workers=self.args.workers or None)
+        print(f"[INFO] Training images from cache: {cache_dir}")
+
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        cfg = self.args
+        return CachedYOLODataset(
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=cfg,
+            rect=cfg.rect or mode == "val",
+            cache=cfg.cache or None,
+            single_cls=cfg.single_cls or False,
+            stride=gs,
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=self.data,
+            fraction=cfg.fraction if mode == "train" else 1.0,
+            cache_dir=cache_dir,
+        )
+
+
+# --- COMMAND LINE ---
+def main():
+    parser = argparse.ArgumentParser(description="Pre-resize dataset images into a memory-mapped training cache")
+    parser.add_argument("--split", nargs="+", default=SPLITS)
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the cache is up to date")
+    args = parser.parse_args()
+
+    for split in args.split:
+        image_dir = os.path.join(DATASET_ROOT_DIR, split, 'images')
+        if not os.path.isdir(image_dir):
+            print(f"Skipping {split}: {image_dir} not found.")
+            continue
+        if not args.force and is_cache_valid(image_dir, args.imgsz):
+            print(f"{split}: cache is up to date.")
+            continue
+        cache_dir = build_cache(image_dir, args.imgsz, args.workers, force=True)
+        cache = ImageCache(cache_dir)
+        size_mb = cache.images.nbytes / (1 << 20)
+        print(f"Cached {split}: {len(cache)} images at {args.imgsz}px, {size_mb:.0f} MB -> {cache_dir}")
+
+
+if __name__ == '__main__':
+    main()
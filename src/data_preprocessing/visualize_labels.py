@@ -1,110 +1,280 @@
-import cv2
-import os
-import random
-import sys
-import tkinter as tk
-
-current_file = os.path.abspath(__file__)
-current_dir = os.path.dirname(current_file)
-project_root = os.path.dirname(os.path.dirname(current_dir))
-
-DATASET_PATH = os.path.join(project_root, "datasets")
-TRAIN_OR_VALID = 'train'
- 
-CLASS_NAMES = ['bus', 'car', 'motor', 'truck']
-NUM_IMAGES_TO_CHECK = 200
-COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
-WINDOW_SCALE_FACTOR = 0.85
-
-if not os.path.exists(DATASET_PATH):
-    print(f"Error: Dataset directory not found at: {DATASET_PATH}")
-    print("Please create 'datasets' folder in the project root.")
-    sys.exit(1)
-
-def get_screen_size():
-    try:
-        root = tk.Tk()
-        root.withdraw()
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        root.destroy()
-        return screen_width, screen_height
-    except tk.TclError:
-        return 1920, 1080
-
-def visualize_annotations():
-    image_dir = os.path.join(DATASET_PATH, TRAIN_OR_VALID, 'images')
-    label_dir = os.path.join(DATASET_PATH, TRAIN_OR_VALID, 'labels')
-    
-    if not os.path.exists(image_dir) or not os.path.exists(label_dir):
-        print(f"Error: Could not find 'images' or 'labels' in {os.path.join(DATASET_PATH, TRAIN_OR_VALID)}")
-        return
-
-    all_files = os.listdir(image_dir)
-    image_files = [f for f in all_files if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-    
-    if not image_files:
-        print(f"No images found in: {image_dir}")
-        return
-
-    screen_w, screen_h = get_screen_size()
-    selected_images = random.sample(image_files, min(NUM_IMAGES_TO_CHECK, len(image_files)))
-    
-    print(f"--- Starting check for {len(selected_images)} random images from: {DATASET_PATH} ---")
-    print("Press any key to show next image. Press 'q' to exit.")
-
-    for image_name in selected_images:
-        image_path = os.path.join(image_dir, image_name)
-        image = cv2.imread(image_path)
-        if image is None: continue
-        
-        h, w, _ = image.shape
-        label_filename = os.path.splitext(image_name)[0] + ".txt"
-        label_path = os.path.join(label_dir, label_filename)
-
-        if os.path.exists(label_path):
-            with open(label_path, 'r') as f:
-                for line in f.readlines():
-                    try:
-                        parts = line.strip().split()
-                        class_id = int(parts[0])
-                        x_center, y_center, width, height = map(float, parts[1:])
-                        bbox_width, bbox_height = int(width * w), int(height * h)
-                        x_center_px, y_center_px = int(x_center * w), int(y_center * h)
-                        x1 = x_center_px - bbox_width // 2
-                        y1 = y_center_px - bbox_height // 2
-                        
-                        class_name = CLASS_NAMES[class_id] if class_id < len(CLASS_NAMES) else str(class_id)
-                        color = COLORS[class_id % len(COLORS)]
-                        
-                        cv2.rectangle(image, (x1, y1), (x1 + bbox_width, y1 + bbox_height), color, 2)
-                        cv2.putText(image, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                    except (ValueError, IndexError):
-                        pass
-        
-        window_name = f"Check Label - {image_name}"
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        
-        target_h = int(screen_h * WINDOW_SCALE_FACTOR)
-        scale = target_h / h
-        target_w = int(w * scale)
-        if target_w > screen_w:
-            scale = (screen_w * 0.95) / w
-            target_w = int(w * scale)
-            target_h = int(h * scale)
-        image_to_show = cv2.resize(image, (target_w, target_h))
-
-        pos_x = (screen_w - target_w) // 2
-        pos_y = (screen_h - target_h) // 2
-        cv2.moveWindow(window_name, pos_x, pos_y)
-        cv2.imshow(window_name, image_to_show)
-        
-        key = cv2.waitKey(0)
-        if key == ord('q'): break
-        cv2.destroyAllWindows()
-
-    cv2.destroyAllWindows()
-    print("\n--- Validation Complete ---")
-
-if __name__ == '__main__':
-    visualize_annotations()
\ No newline at end of file
+import argparse
+import cv2
+import html
+import os
+import random
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+DATASET_PATH = os.path.join(project_root, "datasets")
+TRAIN_OR_VALID = 'train'
+
+CLASS_NAMES = ['bus', 'car', 'motor', 'truck']
+NUM_IMAGES_TO_CHECK = 200
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+WINDOW_SCALE_FACTOR = 0.85
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# --- HEADLESS REVIEW CONFIG ---
+REVIEW_DIR = os.path.join(DATASET_PATH, ".review")
+THUMB_SIZE = 320                          # thumbnail tile edge in pixels
+# Reduced decodes, largest first; an image is decoded at the largest
+# reduction that still leaves its long side >= the thumbnail size
+THUMB_DECODES = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                 (2, cv2.IMREAD_REDUCED_COLOR_2))
+SHEET_COLS = 8
+SHEET_ROWS = 6
+CAPTION_HEIGHT = 18
+JPEG_QUALITY = 85
+
+def get_screen_size():
+    # tkinter is only needed for the interactive viewer
+    try:
+        import tkinter as tk
+    except ImportError:
+        return 1920, 1080
+    try:
+        root = tk.Tk()
+        root.withdraw()
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        root.destroy()
+        return screen_width, screen_height
+    except tk.TclError:
+        return 1920, 1080
+
+def draw_labels(image, label_path, thickness=2, font_scale=0.8):
+    # Returns the number of boxes drawn, or None if there is no label file
+    if not os.path.exists(label_path):
+        return None
+    h, w = image.shape[:2]
+    boxes = 0
+    with open(label_path, 'r') as f:
+        for line in f.readlines():
+            try:
+                parts = line.strip().split()
+                class_id = int(parts[0])
+                x_center, y_center, width, height = map(float, parts[1:])
+                bbox_width, bbox_height = int(width * w), int(height * h)
+                x_center_px, y_center_px = int(x_center * w), int(y_center * h)
+                x1 = x_center_px - bbox_width // 2
+                y1 = y_center_px - bbox_height // 2
+
+                class_name = CLASS_NAMES[class_id] if class_id < len(CLASS_NAMES) else str(class_id)
+                color = COLORS[class_id % len(COLORS)]
+
+                cv2.rectangle(image, (x1, y1), (x1 + bbox_width, y1 + bbox_height), color, thickness)
+                cv2.putText(image, class_name, (x1, y1 - 4 * thickness), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+                boxes += 1
+            except (ValueError, IndexError):
+                pass
+    return boxes
+
+def list_images(image_dir):
+    return sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+def visualize_annotations():
+    image_dir = os.path.join(DATASET_PATH, TRAIN_OR_VALID, 'images')
+    label_dir = os.path.join(DATASET_PATH, TRAIN_OR_VALID, 'labels')
+
+    if not os.path.exists(image_dir) or not os.path.exists(label_dir):
+        print(f"Error: Could not find 'images' or 'labels' in {os.path.join(DATASET_PATH, TRAIN_OR_VALID)}")
+        return
+
+    image_files = list_images(image_dir)
+
+    if not image_files:
+        print(f"No images found in: {image_dir}")
+        return
+
+    screen_w, screen_h = get_screen_size()
+    selected_images = random.sample(image_files, min(NUM_IMAGES_TO_CHECK, len(image_files)))
+
+    print(f"--- Starting check for {len(selected_images)} random images from: {DATASET_PATH} ---")
+    print("Press any key to show next image. Press 'q' to exit.")
+
+    for image_name in selected_images:
+        image_path = os.path.join(image_dir, image_name)
+        image = cv2.imread(image_path)
+        if image is None: continue
+
+        h, w, _ = image.shape
+        label_filename = os.path.splitext(image_name)[0] + ".txt"
+        draw_labels(image, os.path.join(label_dir, label_filename))
+
+        window_name = f"Check Label - {image_name}"
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+
+        target_h = int(screen_h * WINDOW_SCALE_FACTOR)
+        scale = target_h / h
+        target_w = int(w * scale)
+        if target_w > screen_w:
+            scale = (screen_w * 0.95) / w
+            target_w = int(w * scale)
+            target_h = int(h * scale)
+        image_to_show = cv2.resize(image, (target_w, target_h))
+
+        pos_x = (screen_w - target_w) // 2
+        pos_y = (screen_h - target_h) // 2
+        cv2.moveWindow(window_name, pos_x, pos_y)
+        cv2.imshow(window_name, image_to_show)
+
+        key = cv2.waitKey(0)
+        if key == ord('q'): break
+        cv2.destroyAllWindows()
+
+    cv2.destroyAllWindows()
+    print("\n--- Validation Complete ---")
+
+# --- HEADLESS REVIEW ---
+# Thumbnails are decoded at the largest reduction that keeps them at least
+# thumbnail-sized (labels are normalized, so the boxes land in the same place)
+# and rendered across a process pool. 'sheet' tiles them into contact-sheet
+# JPEGs, 'html' writes one thumbnail per image plus an index.html gallery.
+# Images without a label file get a red caption.
+def thumbnail_decode_flag(image_path, thumb_size):
+    # Reads only the image header; full decode if the size is unknown
+    try:
+        from PIL import Image
+        with Image.open(image_path) as im:
+            long_side = max(im.size)
+    except Exception:
+        return cv2.IMREAD_COLOR
+    for factor, flag in THUMB_DECODES:
+        if long_side // factor >= thumb_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+def render_thumbnail(image_path, label_path, thumb_size=THUMB_SIZE):
+    tile = np.zeros((thumb_size + CAPTION_HEIGHT, thumb_size, 3), dtype=np.uint8)
+    image = cv2.imread(image_path, thumbnail_decode_flag(image_path, thumb_size))
+    if image is None:
+        caption, color, boxes = "unreadable", (0, 0, 255), None
+    else:
+        h, w = image.shape[:2]
+        scale = thumb_size / max(h, w)
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        boxes = draw_labels(image, label_path, thickness=1, font_scale=0.4)
+        th, tw = image.shape[:2]
+        y0, x0 = (thumb_size - th) // 2, (thumb_size - tw) // 2
+        tile[y0:y0 + th, x0:x0 + tw] = image
+        caption = "no label" if boxes is None else f"{boxes} box(es)"
+        color = (0, 0, 255) if boxes is None else (200, 200, 200)
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    cv2.putText(tile, f"{name[:28]} {caption}", (3, thumb_size + CAPTION_HEIGHT - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.35, color, 1)
+    return tile, boxes
+
+def _render_sheet(task):
+    sheet_path, pairs, cols, thumb_size = task
+    rows = (len(pairs) + cols - 1) // cols
+    tile_h = thumb_size + CAPTION_HEIGHT
+    sheet = np.zeros((rows * tile_h, cols * thumb_size, 3), dtype=np.uint8)
+    for i, (image_path, label_path) in enumerate(pairs):
+        tile, _ = render_thumbnail(image_path, label_path, thumb_size)
+        r, c = divmod(i, cols)
+        sheet[r * tile_h:(r + 1) * tile_h, c * thumb_size:(c + 1) * thumb_size] = tile
+    cv2.imwrite(sheet_path, sheet, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return sheet_path
+
+def _render_thumbs(task):
+    thumb_dir, pairs, thumb_size = task
+    results = []
+    for image_path, label_path in pairs:
+        tile, boxes = render_thumbnail(image_path, label_path, thumb_size)
+        thumb_name = os.path.splitext(os.path.basename(image_path))[0] + ".jpg"
+        cv2.imwrite(os.path.join(thumb_dir, thumb_name), tile, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        results.append((thumb_name, os.path.basename(image_path), boxes))
+    return results
+
+def write_gallery(path, split, image_dir, entries, thumb_size=THUMB_SIZE):
+    image_href = os.path.relpath(image_dir, os.path.dirname(path)).replace(os.sep, '/')
+    figures = []
+    for thumb_name, image_name, boxes in entries:
+        caption = "no label" if boxes is None else f"{boxes} box(es)"
+        css = ' class="missing"' if boxes is None else ''
+        figures.append(f'<figure{css}><a href="{html.escape(image_href)}/{html.escape(image_name)}">'
+                       f'<img src="thumbs/{html.escape(thumb_name)}" loading="lazy"></a>'
+                       f'<figcaption>{html.escape(image_name)}<br>{caption}</figcaption></figure>')
+    with open(path, 'w') as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+                f"<title>Label review - {html.escape(split)}</title><style>"
+                "body{background:#222;color:#ccc;font:12px sans-serif}"
+                "figure{display:inline-block;margin:4px;width:" + str(thumb_size) + "px}"
+                "figure.missing figcaption{color:#f55}img{width:100%}"
+                "</style></head><body>\n")
+        f.write(f"<h3>{html.escape(split)}: {len(entries)} images</h3>\n")
+        f.write("\n".join(figures))
+        f.write("\n</body></html>\n")
+
+def render_review(split, mode, num_images, out_dir, seed=None, cols=SHEET_COLS, rows=SHEET_ROWS,
+                  thumb_size=THUMB_SIZE, workers=None):
+    image_dir = os.path.join(DATASET_PATH, split, 'images')
+    label_dir = os.path.join(DATASET_PATH, split, 'labels')
+    if not os.path.exists(image_dir):
+        print(f"Error: Could not find 'images' in {os.path.join(DATASET_PATH, split)}")
+        return
+
+    image_files = list_images(image_dir)
+    if num_images and num_images < len(image_files):
+        image_files = sorted(random.Random(seed).sample(image_files, num_images))
+    if not image_files:
+        print(f"No images found in: {image_dir}")
+        return
+
+    pairs = [(os.path.join(image_dir, name), os.path.join(label_dir, os.path.splitext(name)[0] + ".txt"))
+             for name in image_files]
+    out_dir = os.path.join(out_dir, split)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"--- Rendering {len(pairs)} images from {split} ({mode}, {workers} workers) -> {out_dir} ---")
+
+    if mode == 'sheet':
+        per_sheet = cols * rows
+        tasks = [(os.path.join(out_dir, f"sheet_{i // per_sheet + 1:04d}.jpg"), pairs[i:i + per_sheet], cols, thumb_size)
+                 for i in range(0, len(pairs), per_sheet)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(_render_sheet, tasks))
+        print(f"Wrote {len(written)} contact sheet(s) of up to {per_sheet} images.")
+    else:
+        thumb_dir = os.path.join(out_dir, "thumbs")
+        os.makedirs(thumb_dir, exist_ok=True)
+        chunk = max(1, min(64, len(pairs) // (workers * 4) or 1))
+        tasks = [(thumb_dir, pairs[i:i + chunk], thumb_size) for i in range(0, len(pairs), chunk)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = [entry for result in pool.map(_render_thumbs, tasks) for entry in result]
+        write_gallery(os.path.join(out_dir, "index.html"), split, image_dir, entries, thumb_size)
+        print(f"Wrote {os.path.join(out_dir, 'index.html')}")
+
+    missing = sum(1 for _, label_path in pairs if not os.path.exists(label_path))
+    if missing:
+        print(f"Warning: {missing} image(s) have no label file (red captions).")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Review YOLO labels interactively or as headless contact sheets")
+    parser.add_argument("--mode", choices=('interactive', 'sheet', 'html'), default='interactive')
+    parser.add_argument("--split", default=TRAIN_OR_VALID)
+    parser.add_argument("--num", type=int, default=NUM_IMAGES_TO_CHECK, help="images to sample (0 = all; headless modes)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=REVIEW_DIR)
+    parser.add_argument("--cols", type=int, default=SHEET_COLS)
+    parser.add_argument("--rows", type=int, default=SHEET_ROWS)
+    parser.add_argument("--thumb", type=int, default=THUMB_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(DATASET_PATH):
+        print(f"Error: Dataset directory not found at: {DATASET_PATH}")
+        print("Please create 'datasets' folder in the project root.")
+        sys.exit(1)
+
+    if args.mode == 'interactive':
+        TRAIN_OR_VALID = args.split
+        visualize_annotations()
+    else:
+        render_review(args.split, args.mode, args.num, args.out, args.seed, args.cols, args.rows, args.thumb, args.workers)
@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+import cv2
+import numpy as np
+
+# --- CAPTURE CONFIG ---
+POOL_SIZE = 8                 # preallocated frame buffers per camera
+OPEN_TIMEOUT_MS = 5000
+READ_TIMEOUT_MS = 5000
+RECONNECT_BACKOFF_INITIAL = 0.5
+RECONNECT_BACKOFF_MAX = 30.0
+MAX_READ_FAILURES = 25        # consecutive failed reads before reconnecting
+STALE_AFTER = 1.0             # seconds; older frames handed out are counted as stale
+
+
+def open_capture(src):
+    # FFmpeg capture with open/read timeouts where OpenCV supports them;
+    # returns None if the source cannot be opened
+    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+    params = []
+    if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS,
+                  cv2.CAP_PROP_READ_TIMEOUT_MSEC, READ_TIMEOUT_MS]
+    cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG, params)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    return cap
+
+
+class CapturedFrame:
+    # A decoded frame living in one of the pool's buffers. The buffer goes
+    # back to the pool on release() or when this object is garbage collected.
+    def __init__(self, image, timestamp, pts_ms, seq, release):
+        self.image = image
+        self.timestamp = timestamp
+        self.pts_ms = pts_ms
+        self.seq = seq
+        self._finalizer = weakref.finalize(self, release)
+
+    def release(self):
+        self._finalizer()
+
+
+# --- PREALLOCATED FRAME POOL ---
+class FramePool:
+    def __init__(self, shape, size):
+        self.shape = shape
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(size)]
+        self.free = deque(range(size))
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            return self.free.popleft() if self.free else None
+
+    def release(self, index):
+        with self.lock:
+            self.free.append(index)
+
+    def in_use(self):
+        return len(self.buffers) - len(self.free)
+
+
+# --- THREADED VIDEO CAPTURE ---
+# Decodes into recycled buffers and keeps only the latest frame. A frame that
+# is replaced before anyone read it counts as dropped; when all buffers are
+# still held downstream, frames are grabbed without decoding and dropped.
+# Streams reconnect with exponential backoff; local files end at EOF.
+class VideoCaptureThreading:
+    def __init__(self, src, pool_size=POOL_SIZE, decode_observer=None):
+        # decode_observer: optional callable receiving the decode time (s) of every frame
+        self.src = src
+        self.decode_observer = decode_observer
+        self.is_file = isinstance(src, str) and os.path.isfile(src)
+        self.pool_size = pool_size
+        self.finished = False
+        self.opened = False
+
+        self.cap = None
+        self.pool = None
+        self.latest = None
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+
+        self.seq = 0
+        self.frames = 0
+        self.dropped = 0
+        self.stale = 0
+        self.reconnects = 0
+        self.connected = False
+        self.last_frame_time = 0.0
+
+        # Files must open right away; streams keep retrying in the reader
+        if self.is_file and not self._connect():
+            print(f"[ERROR] Failed to open connection to: {src}")
+            return
+
+        self.opened = True
+        self.t = threading.Thread(target=self._reader, name=f"capture-{src}", daemon=True)
+        self.t.start()
+
+    def _connect(self):
+        self.cap = open_capture(self.src)
+        return self.cap is not None
+
+    def _reconnect(self):
+        backoff = RECONNECT_BACKOFF_INITIAL
+        while not self.stop_event.is_set():
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+            if self._connect():
+                self.connected = True
+                return True
+            print(f"[WARNING] Reconnect to {self.src} failed, retrying in {backoff:.1f}s")
+            self.stop_event.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        return False
+
+    def _ensure_pool(self):
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        shape = (height, width, 3)
+        if width > 0 and height > 0 and (self.pool is None or self.pool.shape != shape):
+            # Buffers of an old pool still held downstream are simply dropped
+            self.pool = FramePool(shape, self.pool_size)
+
+    def _publish(self, pool, index, ts, pts_ms):
+        self.seq += 1
+        frame = CapturedFrame(pool.buffers[index], ts, pts_ms, self.seq, lambda: pool.release(index))
+        with self.cond:
+            if self.latest is not None:
+                self.dropped += 1
+            self.latest = frame
+            self.cond.notify_all()
+        self.frames += 1
+        self.last_frame_time = ts
+
+    def _decode(self, pool, index):
+        buf = pool.buffers[index] if pool is not None else None
+        t0 = time.perf_counter()
+        ret, image = self.cap.read(buf)
+        if ret and self.decode_observer is not None:
+            self.decode_observer(time.perf_counter() - t0)
+        if not ret:
+            if pool is not None:
+                pool.release(index)
+            return False
+
+        if image is not buf:
+            # Unknown or changed frame size: rebuild the pool for the new size
+            if pool is not None:
+                pool.release(index)
+            self.pool = pool = FramePool(image.shape, self.pool_size)
+            index = pool.acquire()
+            np.copyto(pool.buffers[index], image)
+
+        self._publish(pool, index, time.time(), self.cap.get(cv2.CAP_PROP_POS_MSEC))
+        return True
+
+    def _reader(self):
+        if self.cap is None and not self._reconnect():
+            return
+        self.connected = True
+        self._ensure_pool()
+        failures = 0
+
+        while not self.stop_event.is_set():
+            pool = self.pool
+            index = pool.acquire() if pool is not None else None
+
+            if pool is not None and index is None:
+                # Every buffer is still in use downstream: skip decoding
+                ret = self.cap.grab()
+                if ret:
+                    self.dropped += 1
+            else:
+                ret = self._decode(pool, index)
+
+            if ret:
+                failures = 0
+                continue
+
+            # A local file does not come back, a stream might
+            if self.is_file:
+                self.finished = True
+                with self.cond:
+                    self.cond.notify_all()
+                break
+
+            failures += 1
+            if failures >= MAX_READ_FAILURES:
+                print(f"[WARNING] Stream {self.src} lost, reconnecting...")
+                self.connected = False
+                if not self._reconnect():
+                    break
+                self.reconnects += 1
+                self._ensure_pool()
+                failures = 0
+            else:
+                time.sleep(0.01)
+
+    def _take(self):
+        frame = self.latest
+        self.latest = None
+        if frame is not None and time.time() - frame.timestamp > STALE_AFTER:
+            self.stale += 1
+        return frame
+
+    def read(self, timeout=1):
+        if not self.opened:
+            return None
+        with self.cond:
+            if self.latest is None and not self.finished:
+                self.cond.wait(timeout)
+            return self._take()
+
+    def read_latest(self):
+        if not self.opened:
+            return None
+        with self.cond:
+            return self._take()
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'stale': self.stale,
+            'reconnects': self.reconnects,
+            'connected': self.connected,
+            'buffers_in_use': self.pool.in_use() if self.pool is not None else 0,
+        }
+
+    def release(self):
+        self.stop_event.set()
+        if self.opened:
+            self.t.join(timeout=READ_TIMEOUT_MS / 1000 + 1)
+        if self.cap is not None:
+            self.cap.release()
@@ -0,0 +1,166 @@
+import os
+import re
+
+import numpy as np
+import yaml
+
+ROI_NAME_PATTERN = re.compile(r"^\s*([\w\-.]+)\s*:\s*$")
+ROI_ENTRY_PATTERN = re.compile(r"^\s*(zone|line)\s+([\w\-.]+)\s*:\s*(.*)$")
+ROI_POINT_PATTERN = re.compile(r"\[\s*(-?\d+)\s*,\s*(-?\d+)\s*\]")
+DEFAULT_ZONE_NAME = "roi"
+
+
+class Zone:
+    def __init__(self, name, polygon):
+        self.name = name
+        self.polygon = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError(f"Zone '{name}' needs at least 3 points")
+
+
+class CountingLine:
+    # Crossing from the right side of A->B to its left side is 'in',
+    # the opposite crossing is 'out' (image coordinates, y pointing down).
+    def __init__(self, name, points):
+        self.name = name
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        if len(self.points) != 2:
+            raise ValueError(f"Line '{name}' needs exactly 2 points")
+
+
+class RoiSet:
+    def __init__(self):
+        self.zones = []
+        self.lines = []
+
+    def add_zone(self, name, polygon):
+        if name is None:
+            # Unnamed polygons: roi, roi_2, roi_3, ...
+            index = len(self.zones) + 1
+            name = DEFAULT_ZONE_NAME if index == 1 else f"{DEFAULT_ZONE_NAME}_{index}"
+        self.zones.append(Zone(name, polygon))
+
+    def add_line(self, name, points):
+        self.lines.append(CountingLine(name, points))
+
+
+class CameraConfig:
+    def __init__(self, name, source, zones, lines=None):
+        self.name = name
+        self.source = source
+        self.zones = zones
+        self.lines = lines or []
+
+    @property
+    def polygons(self):
+        return [zone.polygon for zone in self.zones]
+
+    @property
+    def is_file(self):
+        return isinstance(self.source, str) and os.path.isfile(self.source)
+
+
+def parse_points(text):
+    return np.array(ROI_POINT_PATTERN.findall(text), dtype=np.int32).reshape(-1, 2)
+
+
+def load_roi_list(path):
+    # roi-list.txt format:
+    #   <camera>:
+    #   np.array([[x, y], [x, y], ...])              unnamed zone (roi, roi_2, ...)
+    #   zone <name>: np.array([[x, y], ...])         named zone
+    #   line <name>: np.array([[x1, y1], [x2, y2]])  directional counting line
+    rois = {}
+    current = None
+
+    if not os.path.exists(path):
+        return rois
+
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+
+            match = ROI_NAME_PATTERN.match(line)
+            if match:
+                current = match.group(1)
+                rois.setdefault(current, RoiSet())
+                continue
+
+            if current is None:
+                continue
+
+            match = ROI_ENTRY_PATTERN.match(line)
+            if match:
+                kind, name, rest = match.groups()
+                if kind == 'zone':
+                    rois[current].add_zone(name, parse_points(rest))
+                else:
+                    rois[current].add_line(name, parse_points(rest))
+                continue
+
+            points = parse_points(line)
+            if len(points) >= 3:
+                rois[current].add_zone(None, points)
+
+    return rois
+
+
+def resolve_source(source, root_dir):
+    if isinstance(source, int):
+        return source
+    source = str(source)
+    if source.isdigit():
+        return int(source)
+    if "://" in source or os.path.isabs(source):
+        return source
+    return os.path.join(root_dir, source)
+
+
+def load_cameras(config_path, roi_list_path, root_dir):
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+
+    rois = load_roi_list(roi_list_path)
+    cameras = []
+
+    for entry in config.get('cameras', []):
+        name = entry['name']
+        roi_set = RoiSet()
+        inline = any(key in entry for key in ('polygons', 'zones', 'lines'))
+
+        # Zones/lines from roi-list.txt (explicit `roi`, or the camera name
+        # when nothing is defined inline)
+        roi_name = entry.get('roi', None if inline else name)
+        if roi_name is not None:
+            if roi_name not in rois:
+                raise ValueError(f"Camera '{name}': ROI '{roi_name}' not found in {roi_list_path}")
+            roi_set.zones.extend(rois[roi_name].zones)
+            roi_set.lines.extend(rois[roi_name].lines)
+
+        for polygon in entry.get('polygons', []):
+            roi_set.add_zone(None, polygon)
+        for zone in entry.get('zones', []):
+            roi_set.add_zone(zone['name'], zone['polygon'])
+        for line in entry.get('lines', []):
+            roi_set.add_line(line['name'], line['points'])
+
+        if not roi_set.zones and not roi_set.lines:
+            raise ValueError(f"Camera '{name}' has no counting zones or lines")
+
+        zone_names = [zone.name for zone in roi_set.zones]
+        line_names = [line.name for line in roi_set.lines]
+        if len(set(zone_names)) != len(zone_names) or len(set(line_names)) != len(line_names):
+            raise ValueError(f"Camera '{name}': duplicate zone or line names")
+
+        source = resolve_source(entry['source'], root_dir)
+        cameras.append(CameraConfig(name, source, roi_set.zones, roi_set.lines))
+
+    if not cameras:
+        raise ValueError(f"No cameras defined in {config_path}")
+
+    names = [cam.name for cam in cameras]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate camera names in {config_path}")
+
+    return cameras
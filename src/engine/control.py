@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+# --- CONTROLLER CONFIG ---
+IMGSZ_STEP = 64               # detector input size changes in multiples of the model stride
+CONTROL_INTERVAL = 2.0        # seconds per evaluation window
+DEGRADE_ABOVE = 1.0           # p95 latency above budget * this -> lower quality
+UPGRADE_BELOW = 0.6           # p95 latency below budget * this -> may raise quality
+MAX_DROP_RATIO = 0.5          # share of captured frames replaced before inference
+UPGRADE_WINDOWS = 3           # consecutive good windows before raising quality
+COOLDOWN = 4.0                # seconds after a change before the next one
+
+
+class QualityLevel:
+    def __init__(self, imgsz, stride, conf):
+        self.imgsz = imgsz
+        self.stride = stride
+        self.conf = conf
+
+    def describe(self):
+        return f"imgsz={self.imgsz} stride={self.stride} conf={self.conf:.2f}"
+
+
+def build_levels(max_imgsz=640, min_imgsz=320, max_stride=3, min_conf=0.25, max_conf=0.4):
+    # Level 0 is full quality. Each step down lowers the input size, every
+    # third step skips one more frame instead; the confidence threshold rises
+    # linearly over the ladder (fewer low-score boxes to track).
+    steps = [(max_imgsz, 1)]
+    imgsz, stride = max_imgsz, 1
+    while imgsz - IMGSZ_STEP >= min_imgsz or stride < max_stride:
+        if stride < max_stride and (len(steps) % 3 == 0 or imgsz - IMGSZ_STEP < min_imgsz):
+            stride += 1
+        else:
+            imgsz -= IMGSZ_STEP
+        steps.append((imgsz, stride))
+
+    n = max(len(steps) - 1, 1)
+    return [QualityLevel(imgsz, stride, min_conf + (max_conf - min_conf) * i / n)
+            for i, (imgsz, stride) in enumerate(steps)]
+
+
+# --- ADAPTIVE QUALITY CONTROLLER ---
+# Watches the capture-to-count latency of every camera and the share of frames
+# the captures had to drop. When the worst camera's p95 latency is over budget
+# (or drops pile up), quality goes down one level right away; it only goes up
+# again after several windows comfortably under budget, and never within the
+# cooldown after a change, so it does not oscillate. Detector input size and
+# confidence are shared by all cameras, the frame stride applies to each one.
+class QualityController:
+    def __init__(self, detector, cameras, latency_budget, levels):
+        self.detector = detector
+        self.cameras = cameras
+        self.budget = latency_budget
+        self.levels = levels
+        self.level = 0
+
+        self.latencies = {}
+        self.good_windows = 0
+        self.window_start = time.time()
+        self.last_change = 0.0
+        self.last_capture = self._capture_totals()
+        self.changes = 0
+        self.apply(levels[0])
+
+    def _capture_totals(self):
+        frames = dropped = 0
+        for cam in self.cameras:
+            if cam.cap is not None:
+                st = cam.cap.stats()
+                frames += st['frames']
+                dropped += st['dropped']
+        return frames, dropped
+
+    def apply(self, level):
+        self.detector.imgsz = level.imgsz
+        self.detector.conf = level.conf
+        for cam in self.cameras:
+            cam.stride = level.stride
+
+    def observe(self, result):
+        # Called for every counted frame
+        self.latencies.setdefault(result.camera.name, []).append(time.time() - result.timestamp)
+        self.maybe_update()
+
+    def maybe_update(self):
+        now = time.time()
+        if now - self.window_start < CONTROL_INTERVAL:
+            return
+        self.window_start = now
+
+        frames, dropped = self._capture_totals()
+        new_frames = frames - self.last_capture[0]
+        drop_ratio = (dropped - self.last_capture[1]) / new_frames if new_frames > 0 else 0.0
+        self.last_capture = (frames, dropped)
+
+        if not self.latencies:
+            return
+        worst_name, worst = max(((name, float(np.percentile(values, 95)))
+                                 for name, values in self.latencies.items()), key=lambda x: x[1])
+        self.latencies = {}
+        status = f"p95 latency {worst * 1000:.0f}ms [{worst_name}] budget {self.budget * 1000:.0f}ms, drops {drop_ratio:.0%}"
+
+        over = worst > self.budget * DEGRADE_ABOVE or drop_ratio > MAX_DROP_RATIO
+        under = worst < self.budget * UPGRADE_BELOW and drop_ratio <= MAX_DROP_RATIO / 2
+        self.good_windows = self.good_windows + 1 if under else 0
+        if now - self.last_change < COOLDOWN:
+            return
+
+        if over and self.level < len(self.levels) - 1:
+            self.change(self.level + 1, "degrade", status)
+        elif self.good_windows >= UPGRADE_WINDOWS and self.level > 0:
+            self.change(self.level - 1, "upgrade", status)
+
+    def change(self, level, reason, status):
+        old, new = self.levels[self.level], self.levels[level]
+        print(f"[CONTROL] {reason} level {self.level} -> {level}: {status} | "
+              f"{old.describe()} -> {new.describe()}")
+        self.level = level
+        self.apply(new)
+        self.changes += 1
+        self.good_windows = 0
+        self.last_change = time.time()
+
+    def stats(self):
+        level = self.levels[self.level]
+        return [f"[CONTROL] level {self.level}/{len(self.levels) - 1} {level.describe()} changes={self.changes}"]
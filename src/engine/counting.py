@@ -0,0 +1,133 @@
+import numpy as np
+
+from src.engine.track_store import TrackStore
+from src.engine.zones import ZoneMask, bottom_centers
+
+LINE_DIRECTIONS = ('in', 'out')
+
+
+class CountEvent:
+    # kind is 'zone' or 'line'; direction is only set for lines
+    def __init__(self, kind, name, track_id, cls_name, direction=None):
+        self.kind = kind
+        self.name = name
+        self.track_id = track_id
+        self.cls_name = cls_name
+        self.direction = direction
+
+
+def line_crossings(prev_x, prev_y, xs, ys, starts, ends):
+    # Tests the movement prev -> current of every track against every line
+    # at once. Returns (crossed, inward), both shaped (tracks, lines).
+    px, py = prev_x[:, None].astype(np.float64), prev_y[:, None].astype(np.float64)
+    qx, qy = xs[:, None].astype(np.float64), ys[:, None].astype(np.float64)
+    ax, ay = starts[:, 0].astype(np.float64), starts[:, 1].astype(np.float64)
+    bx, by = ends[:, 0].astype(np.float64), ends[:, 1].astype(np.float64)
+
+    # Side of each position relative to A->B (>= 0 is the right side)
+    side_prev = (bx - ax) * (py - ay) - (by - ay) * (px - ax) >= 0
+    side_curr = (bx - ax) * (qy - ay) - (by - ay) * (qx - ax) >= 0
+
+    # A and B must lie on different sides of the movement segment
+    orient_a = (qx - px) * (ay - py) - (qy - py) * (ax - px)
+    orient_b = (qx - px) * (by - py) - (qy - py) * (bx - px)
+
+    crossed = (side_prev != side_curr) & (orient_a * orient_b <= 0)
+    inward = side_prev & ~side_curr
+    return crossed, inward
+
+
+# --- COUNTING ENGINE ---
+# Zones: a vehicle is counted once per zone, the first time the bottom-center
+# of its box is strictly inside the zone polygon. Membership for all tracks of
+# a frame is resolved with one lookup into the camera's zone mask.
+# Lines: a vehicle is counted once per line, when its bottom-center moves
+# across the line between two frames; the side it comes from gives the
+# direction ('in' = right -> left of the line's A->B direction).
+# vehicle_counts holds the per-class total: every vehicle counted once, on its
+# first zone or line hit.
+# Per-track state lives in a TrackStore that forgets tracks once the tracker
+# itself has dropped them (max_age = track_buffer frames).
+class VehicleCounter:
+    def __init__(self, class_names, zones, lines, max_age):
+        self.class_names = class_names
+        self.zones = zones
+        self.lines = lines
+        self.zone_mask = ZoneMask([zone.polygon for zone in zones])
+        self.line_starts = np.array([line.points[0] for line in lines], dtype=np.int64).reshape(-1, 2)
+        self.line_ends = np.array([line.points[1] for line in lines], dtype=np.int64).reshape(-1, 2)
+
+        names = list(class_names.values())
+        self.vehicle_counts = {name: 0 for name in names}
+        self.zone_counts = {zone.name: {name: 0 for name in names} for zone in zones}
+        self.line_counts = {
+            line.name: {direction: {name: 0 for name in names} for direction in LINE_DIRECTIONS}
+            for line in lines
+        }
+        self.tracks = TrackStore(max_age)
+        self.new_events = []
+
+    def _class_name(self, cls):
+        return self.class_names.get(int(cls), str(cls))
+
+    def _count_total(self, cls_name):
+        if cls_name in self.vehicle_counts:
+            self.vehicle_counts[cls_name] += 1
+
+    def update(self, tracks):
+        # Returns the inside flag (any zone) of every track; counting events
+        # of this frame are listed in self.new_events
+        self.new_events = []
+        store = self.tracks
+        if len(tracks) == 0:
+            store.expire(tracks.frame_id)
+            return np.zeros(0, dtype=bool)
+
+        cx, cy = bottom_centers(tracks.boxes)
+        zone_bits = self.zone_mask.lookup(cx, cy).astype(np.uint32)
+        inside_flags = zone_bits != 0
+
+        ids = tracks.ids
+        clss = tracks.clss
+        slots, prev_x, prev_y, is_new = store.upsert(ids, clss, cx, cy, tracks.frame_id)
+        hit = inside_flags.copy()
+
+        # --- ZONES ---
+        new_zone_bits = zone_bits & ~store.zones_counted[slots]
+        store.zones_counted[slots] |= new_zone_bits
+        for i in np.flatnonzero(new_zone_bits).tolist():
+            cls_name = self._class_name(clss[i])
+            bits = int(new_zone_bits[i])
+            for z, zone in enumerate(self.zones):
+                if bits >> z & 1:
+                    counts = self.zone_counts[zone.name]
+                    if cls_name in counts:
+                        counts[cls_name] += 1
+                    self.new_events.append(CountEvent('zone', zone.name, int(ids[i]), cls_name))
+
+        # --- LINES ---
+        if self.lines:
+            crossed, inward = line_crossings(prev_x, prev_y, cx, cy, self.line_starts, self.line_ends)
+            line_bits = np.uint32(1) << np.arange(len(self.lines), dtype=np.uint32)
+            already = (store.lines_crossed[slots][:, None] & line_bits) != 0
+            crossed &= ~is_new[:, None] & ~already
+            store.lines_crossed[slots] |= (crossed * line_bits).sum(axis=1).astype(np.uint32)
+            hit |= crossed.any(axis=1)
+
+            for i, l in zip(*np.nonzero(crossed)):
+                line = self.lines[l]
+                cls_name = self._class_name(clss[i])
+                direction = 'in' if inward[i, l] else 'out'
+                counts = self.line_counts[line.name][direction]
+                if cls_name in counts:
+                    counts[cls_name] += 1
+                self.new_events.append(CountEvent('line', line.name, int(ids[i]), cls_name, direction))
+
+        # --- TOTALS ---
+        newly_counted = hit & ~store.counted[slots]
+        store.counted[slots[newly_counted]] = True
+        for i in np.flatnonzero(newly_counted).tolist():
+            self._count_total(self._class_name(clss[i]))
+
+        store.expire(tracks.frame_id)
+        return inside_flags
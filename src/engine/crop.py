@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+DEFAULT_MARGIN = 64
+STRIDE = 32
+MIN_PIXEL_SAVING = 1.25   # crops covering most of the frame are not worth it
+
+
+# --- ROI-CROPPED INFERENCE ---
+# Counting only looks at the zones and lines of a camera, so the detector only
+# needs the bounding rectangle around them plus a margin (vehicles entering a
+# zone are still partly outside of it). The crop is detected at the same scale
+# as the full frame would be: imgsz shrinks with the crop and is rounded up to
+# the model stride. Boxes are shifted back to frame coordinates afterwards.
+class CropRegion:
+    def __init__(self, x0, y0, x1, y1, frame_shape, imgsz):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.frame_shape = frame_shape
+        self.imgsz = imgsz
+        self.offset = np.array([x0, y0, x0, y0], dtype=np.float32)
+
+    @property
+    def size(self):
+        return self.x1 - self.x0, self.y1 - self.y0
+
+    @property
+    def pixel_saving(self):
+        w, h = self.size
+        return self.frame_shape[0] * self.frame_shape[1] / max(w * h, 1)
+
+    def crop(self, frame):
+        # A view into the frame, no copy
+        return frame[self.y0:self.y1, self.x0:self.x1]
+
+    def to_frame(self, data):
+        # data: (N, 6) x1, y1, x2, y2, conf, cls in crop coordinates
+        data = np.array(data, dtype=np.float32).reshape(-1, 6)
+        data[:, :4] += self.offset
+        return data
+
+    def describe(self):
+        w, h = self.size
+        return (f"ROI crop {w}x{h} at ({self.x0},{self.y0}), imgsz {self.imgsz[1]}x{self.imgsz[0]} "
+                f"({self.pixel_saving:.1f}x fewer pixels)")
+
+
+def crop_imgsz(crop_w, crop_h, frame_shape, imgsz):
+    # (h, w) input size that keeps the full-frame detection scale
+    scale = imgsz / max(frame_shape[0], frame_shape[1])
+    h = max(STRIDE, math.ceil(crop_h * scale / STRIDE) * STRIDE)
+    w = max(STRIDE, math.ceil(crop_w * scale / STRIDE) * STRIDE)
+    return min(h, imgsz), min(w, imgsz)
+
+
+def build_crop_region(zones, lines, frame_shape, imgsz, margin=DEFAULT_MARGIN):
+    # None when the camera has no geometry or the crop would barely help
+    points = [zone.polygon for zone in zones] + [line.points for line in lines]
+    if not points:
+        return None
+    points = np.concatenate(points).reshape(-1, 2)
+
+    height, width = frame_shape[:2]
+    x0 = int(max(0, points[:, 0].min() - margin))
+    y0 = int(max(0, points[:, 1].min() - margin))
+    x1 = int(min(width, points[:, 0].max() + margin + 1))
+    y1 = int(min(height, points[:, 1].max() + margin + 1))
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    region = CropRegion(x0, y0, x1, y1, (height, width),
+                        crop_imgsz(x1 - x0, y1 - y0, (height, width), imgsz))
+    if region.pixel_saving < MIN_PIXEL_SAVING:
+        return None
+    return region
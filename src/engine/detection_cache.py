@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+
+def model_fingerprint(weights_path):
+    # sha256 of the weights file, or of every file of an exported model folder
+    h = hashlib.sha256()
+    if os.path.isdir(weights_path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(weights_path) for name in names)
+    else:
+        files = [weights_path]
+    for path in files:
+        h.update(os.path.relpath(path, weights_path).encode())
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def detection_key(video_path, detector, region=None):
+    # Everything the raw detections depend on. The video is identified by
+    # path, size and mtime, the model by the hash of its weights.
+    st = os.stat(video_path)
+    imgsz = region.imgsz if region is not None else detector.imgsz
+    return {
+        'version': CACHE_VERSION,
+        'video': os.path.abspath(video_path),
+        'video_size': st.st_size,
+        'video_mtime_ns': st.st_mtime_ns,
+        'model': model_fingerprint(detector.weights),
+        'imgsz': [int(v) for v in imgsz] if isinstance(imgsz, (tuple, list)) else int(imgsz),
+        'conf': float(detector.conf),
+        'crop': None if region is None else [int(region.x0), int(region.y0), int(region.x1), int(region.y1)],
+    }
+
+
+def cache_path(cache_dir, key):
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(key['video']))[0]
+    imgsz = "x".join(map(str, key['imgsz'])) if isinstance(key['imgsz'], list) else key['imgsz']
+    return os.path.join(cache_dir, f"{stem}_{key['model'][:8]}_{imgsz}_{digest}.npz")
+
+
+# --- CACHED DETECTIONS ---
+# All raw detections of one video: boxes (M, 6) x1, y1, x2, y2, conf, cls in
+# frame coordinates, frame i is boxes[offsets[i]:offsets[i + 1]].
+class CachedDetections:
+    def __init__(self, boxes, offsets, frame_size, fps, key=None):
+        self.boxes = boxes
+        self.offsets = offsets
+        self.frame_size = tuple(frame_size)
+        self.fps = fps
+        self.key = key
+        self.path = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def frame(self, i):
+        return self.boxes[self.offsets[i]:self.offsets[i + 1]]
+
+    def frames(self, min_conf=None):
+        # Optionally drops boxes below min_conf, e.g. to replay a stricter detector threshold
+        for i in range(len(self)):
+            data = self.frame(i)
+            yield data if min_conf is None else data[data[:, 4] >= min_conf]
+
+    @classmethod
+    def from_frames(cls, detections, frame_size, fps, key=None):
+        counts = np.array([len(d) for d in detections], dtype=np.int64)
+        offsets = np.zeros(len(detections) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        boxes = np.concatenate(detections).astype(np.float32) if detections else np.zeros((0, 6), np.float32)
+        return cls(boxes.reshape(-1, 6), offsets, frame_size, fps, key)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, boxes=self.boxes, offsets=self.offsets,
+                 frame_size=np.array(self.frame_size), fps=np.array(self.fps),
+                 key=np.array(json.dumps(self.key, sort_keys=True)))
+        os.replace(tmp_path, path)
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            cached = cls(data['boxes'], data['offsets'], tuple(int(v) for v in data['frame_size']),
+                         float(data['fps']), json.loads(str(data['key'])))
+        cached.path = path
+        return cached
+
+
+def load_or_detect(runner, camera_config, cache_dir):
+    # Detections of a video file through an OfflineRunner, computed once per
+    # video / model / input size / confidence / crop and reused afterwards
+    video_path = camera_config.source
+    frame_count, frame_size, fps = runner.probe(video_path)
+    region = runner.crop_region(camera_config, frame_size)
+    key = detection_key(video_path, runner.detector, region)
+    path = cache_path(cache_dir, key)
+
+    if os.path.exists(path):
+        try:
+            cached = CachedDetections.load(path)
+            if cached.key == key:
+                print(f"[INFO] [{camera_config.name}] Cached detections: {path} ({len(cached)} frames)")
+                return cached
+        except Exception as e:
+            print(f"[WARNING] [{camera_config.name}] Ignoring unreadable detection cache {path}: {e}")
+
+    print(f"[INFO] [{camera_config.name}] Detecting {frame_count} frames of {video_path}...")
+    detections = list(runner.iter_detections(video_path, frame_count, region))
+    cached = CachedDetections.from_frames(detections, frame_size, fps, key)
+    cached.save(path)
+    print(f"[INFO] [{camera_config.name}] Saved {len(cached)} frames of detections: {path}")
+    return cached
@@ -0,0 +1,102 @@
+import os
+import time
+
+import numpy as np
+
+# --- DETECTOR BACKENDS ---
+# torch          : the fine-tuned .pt weights through PyTorch
+# onnx           : ONNX Runtime (CPU)
+# openvino       : OpenVINO FP32
+# openvino-int8  : OpenVINO INT8, quantized with NNCF on the validation split
+# Exported models are written next to the .pt file once and reused afterwards.
+# They are exported with dynamic shapes, so batched multi-camera inference and
+# other input sizes keep working.
+BACKENDS = ('torch', 'onnx', 'openvino', 'openvino-int8')
+
+EXPORT_ARGS = {
+    'onnx': dict(format='onnx', dynamic=True, simplify=True),
+    'openvino': dict(format='openvino', dynamic=True),
+    'openvino-int8': dict(format='openvino', dynamic=True, int8=True),
+}
+
+
+def exported_model_path(model_path, backend):
+    stem, _ = os.path.splitext(model_path)
+    if backend == 'onnx':
+        return stem + ".onnx"
+    if backend == 'openvino':
+        return stem + "_openvino_model"
+    if backend == 'openvino-int8':
+        return stem + "_int8_openvino_model"
+    return model_path
+
+
+def export_model(model_path, backend, imgsz=640, data=None):
+    # data: dataset yaml whose 'val' images are used for INT8 calibration
+    if backend not in EXPORT_ARGS:
+        raise ValueError(f"Backend '{backend}' cannot be exported, expected one of {tuple(EXPORT_ARGS)}")
+    if backend == 'openvino-int8' and data is None:
+        raise ValueError("INT8 export needs a dataset yaml for calibration")
+
+    target = exported_model_path(model_path, backend)
+    kwargs = dict(EXPORT_ARGS[backend], imgsz=imgsz, device='cpu')
+    if data is not None and backend == 'openvino-int8':
+        kwargs['data'] = data
+
+    from ultralytics import YOLO
+
+    exported = YOLO(model_path).export(**kwargs)
+    exported = str(exported)
+    if os.path.normpath(exported) != os.path.normpath(target):
+        # Keep the INT8 model apart from the FP32 one
+        if os.path.exists(target):
+            raise FileExistsError(f"Export target already exists: {target}")
+        os.replace(exported, target)
+    return target
+
+
+def resolve_model(model_path, backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    path = exported_model_path(model_path, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {backend} export found at {path}. "
+                                f"Run: python tools/export_backends.py --backend {backend}")
+    return path
+
+
+# --- SHARED DETECTOR ---
+# One model instance serves every camera. Frames from all cameras are sent
+# through a single batched forward pass; tracking happens per camera afterwards.
+# ultralytics is only imported here, so tools and config checks start fast.
+class Detector:
+    def __init__(self, model_path, conf=0.25, imgsz=640, backend='torch'):
+        from ultralytics import YOLO
+
+        self.model_path = model_path
+        self.backend = backend
+        self.conf = conf
+        self.imgsz = imgsz
+        self.weights = resolve_model(model_path, backend)
+        self.model = YOLO(self.weights, task='detect')
+        self.names = self.model.names
+
+    def detect(self, frames, imgsz=None):
+        # imgsz: int or (h, w) override, e.g. for ROI crops
+        if not frames:
+            return []
+        imgsz = self.imgsz if imgsz is None else imgsz
+        results = self.model.predict(frames, conf=self.conf, imgsz=imgsz, verbose=False)
+        return [r.boxes.cpu().numpy() for r in results]
+
+    def warmup(self, batch=1, frame_shape=None):
+        # One predict call on black frames pays the lazy initialization
+        # (predictor setup, backend compilation, memory allocation) before the
+        # first real frame arrives; returns the seconds it took
+        if frame_shape is None:
+            size = self.imgsz if isinstance(self.imgsz, int) else max(self.imgsz)
+            frame_shape = (size, size, 3)
+        frames = [np.zeros(frame_shape, dtype=np.uint8)] * batch
+        t0 = time.perf_counter()
+        self.detect(frames)
+        return time.perf_counter() - t0
@@ -0,0 +1,326 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "vehicle_counting_"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# --- METRIC TYPES ---
+# Minimal Prometheus-compatible metrics (no client library needed). Each
+# labelled child has its own lock; hot paths keep the child returned by
+# labels() so a sample costs one lock and, for histograms, one bisect.
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    @property
+    def family_name(self):
+        # Name used in HELP/TYPE; samples may add suffixes (_bucket, _sum, ...)
+        return self.name
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._child())
+        return child
+
+    def samples(self):
+        for key, child in list(self.children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    @property
+    def family_name(self):
+        # HELP, TYPE and the samples must all name the '_total' family
+        return self.name + "_total"
+
+    def _child(self):
+        return _Value()
+
+    def render(self):
+        for labels, child in self.samples():
+            yield f"{self.family_name}{_format_labels(labels)} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _child(self):
+        return _Value()
+
+    def render(self):
+        for labels, child in self.samples():
+            yield f"{self.family_name}{_format_labels(labels)} {_format_value(child.value)}"
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def render(self):
+        for labels, child in self.samples():
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+# --- REGISTRY ---
+# Metrics are either updated where things happen, or read at scrape time
+# from state the pipeline keeps anyway (collectors), which costs nothing
+# on the hot path.
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, func):
+        # func() is called on every scrape, it updates gauges/counters in place
+        self.collectors.append(func)
+
+    def render(self):
+        for func in self.collectors:
+            func()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.family_name} {metric.help}")
+            lines.append(f"# TYPE {metric.family_name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- HTTP ENDPOINT ---
+class MetricsServer:
+    def __init__(self, registry, host='127.0.0.1', port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# --- STARTUP TIMING ---
+# Seconds from process start to each startup phase and to the first counted
+# frame of every camera, i.e. how much traffic a restart misses
+class StartupClock:
+    def __init__(self, started=None):
+        self.started = time.time() if started is None else started
+        self.phases = {}
+        self.first_count = {}
+
+    def mark(self, phase):
+        seconds = time.time() - self.started
+        self.phases[phase] = seconds
+        print(f"[INFO] Startup: {phase} after {seconds:.2f}s")
+        return seconds
+
+    def counted(self, camera_name):
+        if camera_name in self.first_count:
+            return
+        seconds = time.time() - self.started
+        self.first_count[camera_name] = seconds
+        print(f"[INFO] [{camera_name}] Time to first count: {seconds:.2f}s")
+
+
+# --- COUNTING PIPELINE METRICS ---
+# Latencies are observed per camera by the stages; capture, queue, stage and
+# count totals are read from the engine and pipeline when scraped.
+class CountingMetrics:
+    def __init__(self, registry, engine, startup=None):
+        self.engine = engine
+        self.pipeline = None
+        self.startup = startup
+        self.started = time.time() if startup is None else startup.started
+
+        self.decode_seconds = registry.histogram("decode_seconds", "Frame decode latency", ("camera",))
+        self.inference_seconds = registry.histogram("inference_seconds", "Detector call latency for a camera's frame", ("camera",))
+        self.tracking_seconds = registry.histogram("tracking_seconds", "Tracker update latency", ("camera",))
+        self.counting_seconds = registry.histogram("counting_seconds", "Zone/line counting latency", ("camera",))
+        self.render_seconds = registry.histogram("render_seconds", "Frame rendering latency", ("camera",))
+        self.latency_seconds = registry.histogram("end_to_end_seconds", "Capture to counted latency", ("camera",))
+        self.active_tracks = registry.gauge("active_tracks", "Tracks on the last counted frame", ("camera",))
+
+        self.frames = registry.counter("capture_frames", "Frames decoded", ("camera",))
+        self.dropped = registry.counter("capture_dropped_frames", "Frames dropped before inference", ("camera",))
+        self.stale = registry.counter("capture_stale_frames", "Frames handed out older than the stale limit", ("camera",))
+        self.reconnects = registry.counter("capture_reconnects", "Stream reconnects", ("camera",))
+        self.connected = registry.gauge("capture_connected", "1 while the stream is connected", ("camera",))
+        self.buffers_in_use = registry.gauge("capture_buffers_in_use", "Frame pool buffers held downstream", ("camera",))
+        self.vehicles = registry.counter("vehicles_counted", "Vehicles counted per class", ("camera", "class"))
+        self.events = registry.counter("count_events", "Zone and line counting events",
+                                       ("camera", "kind", "name", "direction", "class"))
+
+        self.queue_depth = registry.gauge("queue_depth", "Items waiting in a pipeline queue", ("queue",))
+        self.queue_dropped = registry.counter("queue_dropped", "Items dropped by a pipeline queue", ("queue",))
+        self.stage_processed = registry.counter("stage_processed", "Items processed by a pipeline stage", ("stage",))
+        self.stage_busy = registry.counter("stage_busy_seconds", "Time a pipeline stage spent working", ("stage",))
+        self.uptime = registry.gauge("uptime_seconds", "Seconds since start", ())
+        self.startup_seconds = registry.gauge("startup_seconds", "Seconds from start to a startup phase", ("phase",))
+        self.first_count = registry.gauge("time_to_first_count_seconds",
+                                          "Seconds from start to the camera's first counted frame", ("camera",))
+        registry.add_collector(self.collect)
+
+    def decode_observer(self, camera_name):
+        return self.decode_seconds.labels(camera_name).observe
+
+    def observe_inference(self, result):
+        name = result.camera.name
+        for stage, seconds in result.timings.items():
+            if stage == 'inference':
+                self.inference_seconds.labels(name).observe(seconds)
+            elif stage == 'tracking':
+                self.tracking_seconds.labels(name).observe(seconds)
+
+    def observe_count(self, result, seconds):
+        name = result.camera.name
+        self.counting_seconds.labels(name).observe(seconds)
+        self.latency_seconds.labels(name).observe(time.time() - result.timestamp)
+        self.active_tracks.labels(name).set(len(result.tracks))
+
+    def observe_render(self, result, seconds):
+        self.render_seconds.labels(result.camera.name).observe(seconds)
+
+    def collect(self):
+        self.uptime.labels().set(round(time.time() - self.started, 3))
+        if self.startup is not None:
+            for phase, seconds in list(self.startup.phases.items()):
+                self.startup_seconds.labels(phase).set(round(seconds, 3))
+            for name, seconds in list(self.startup.first_count.items()):
+                self.first_count.labels(name).set(round(seconds, 3))
+        for cam in self.engine.cameras:
+            if cam.cap is not None:
+                st = cam.cap.stats()
+                self.frames.labels(cam.name).set(st['frames'])
+                self.dropped.labels(cam.name).set(st['dropped'])
+                self.stale.labels(cam.name).set(st['stale'])
+                self.reconnects.labels(cam.name).set(st['reconnects'])
+                self.connected.labels(cam.name).set(int(st['connected']))
+                self.buffers_in_use.labels(cam.name).set(st['buffers_in_use'])
+
+            counter = cam.counter
+            for cls_name, count in list(counter.vehicle_counts.items()):
+                self.vehicles.labels(cam.name, cls_name).set(count)
+            for zone_name, counts in list(counter.zone_counts.items()):
+                for cls_name, count in list(counts.items()):
+                    self.events.labels(cam.name, 'zone', zone_name, '', cls_name).set(count)
+            for line_name, directions in list(counter.line_counts.items()):
+                for direction, counts in list(directions.items()):
+                    for cls_name, count in list(counts.items()):
+                        self.events.labels(cam.name, 'line', line_name, direction, cls_name).set(count)
+
+        if self.pipeline is not None:
+            for q in self.pipeline.queues:
+                self.queue_depth.labels(q.name).set(q.depth())
+                self.queue_dropped.labels(q.name).set(q.dropped)
+            for stage in self.pipeline.stages:
+                self.stage_processed.labels(stage.name).set(stage.processed)
+                self.stage_busy.labels(stage.name).set(round(stage.busy_time, 6))
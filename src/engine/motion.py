@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+# --- MOTION GATE CONFIG ---
+MOTION_WIDTH = 160            # the ROI is downscaled to this width before differencing
+PIXEL_THRESHOLD = 20          # grayscale difference that counts as a changed pixel
+MIN_CHANGED_FRACTION = 0.002  # share of changed ROI pixels that counts as motion
+REDETECT_INTERVAL = 15        # frames; the detector runs at least this often
+LINE_THICKNESS = 3            # counting lines are widened to this many pixels in the mask
+
+
+# --- MOTION GATE ---
+# Decides per frame whether the detector has to run. The ROI (zones and
+# counting lines) is cut out, downscaled and blurred in grayscale and compared
+# with the frame of the last detection, so slow changes add up instead of
+# slipping through frame by frame. Without enough change the frame is "idle".
+class MotionGate:
+    def __init__(self, zones, lines, frame_shape, redetect_interval=REDETECT_INTERVAL,
+                 pixel_threshold=PIXEL_THRESHOLD, min_changed_fraction=MIN_CHANGED_FRACTION):
+        self.frame_shape = frame_shape[:2]
+        self.redetect_interval = redetect_interval
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+
+        height, width = self.frame_shape
+        shapes = [zone.polygon for zone in zones] + [line.points for line in lines]
+        if shapes:
+            points = np.concatenate(shapes).reshape(-1, 2)
+            x0, y0 = np.maximum(points.min(axis=0) - LINE_THICKNESS, 0)
+            x1, y1 = points.max(axis=0) + LINE_THICKNESS + 1
+            self.x0, self.y0 = int(x0), int(y0)
+            self.x1, self.y1 = int(min(x1, width)), int(min(y1, height))
+        else:
+            self.x0, self.y0, self.x1, self.y1 = 0, 0, width, height
+
+        roi_w, roi_h = self.x1 - self.x0, self.y1 - self.y0
+        self.scale = min(1.0, MOTION_WIDTH / max(roi_w, 1))
+        self.size = (max(1, round(roi_w * self.scale)), max(1, round(roi_h * self.scale)))
+        # Row/column stride applied before resizing, so the resize touches few pixels
+        self.step = max(1, int(1 / self.scale) // 2)
+
+        # Only pixels inside the zones or on the lines are compared
+        if shapes:
+            self.mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+            offset = np.array([self.x0, self.y0])
+            for zone in zones:
+                poly = np.round((zone.polygon - offset) * self.scale).astype(np.int32)
+                cv2.fillPoly(self.mask, [poly], 255)
+            for line in lines:
+                pts = np.round((line.points - offset) * self.scale).astype(np.int32)
+                cv2.polylines(self.mask, [pts], False, 255, LINE_THICKNESS)
+            self.mask_area = max(int(np.count_nonzero(self.mask)), 1)
+        else:
+            self.mask = None
+            self.mask_area = self.size[0] * self.size[1]
+
+        self.reference = None
+        self.idle_frames = 0
+        self.detected = 0
+        self.skipped = 0
+
+    def _signature(self, frame):
+        roi = frame[self.y0:self.y1:self.step, self.x0:self.x1:self.step]
+        small = cv2.resize(roi, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, signature):
+        diff = cv2.absdiff(signature, self.reference)
+        changed = diff > self.pixel_threshold
+        if self.mask is not None:
+            changed &= self.mask > 0
+        return np.count_nonzero(changed) / self.mask_area
+
+    def should_detect(self, frame):
+        signature = self._signature(frame)
+        if (self.reference is None or self.idle_frames + 1 >= self.redetect_interval
+                or self.changed_fraction(signature) >= self.min_changed_fraction):
+            self.reference = signature
+            self.idle_frames = 0
+            self.detected += 1
+            return True
+
+        self.idle_frames += 1
+        self.skipped += 1
+        return False
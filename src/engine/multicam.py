@@ -0,0 +1,248 @@
+import time
+
+from src.engine.capture import VideoCaptureThreading
+from src.engine.counting import VehicleCounter
+from src.engine.crop import build_crop_region
+from src.engine.motion import MotionGate
+from src.engine.shm_capture import ProcessVideoCapture
+from src.engine.tracking import CameraTracker, load_tracker_args
+
+FPS_SMOOTHING = 0.9
+IDLE_SLEEP = 0.005
+FIRST_FRAME_TIMEOUT = 10.0
+FIRST_FRAME_POLL = 0.05
+
+
+class CameraResult:
+    # Holds on to the CapturedFrame: its pool buffer is recycled once the
+    # result is released or garbage collected
+    def __init__(self, camera, captured, tracks):
+        self.camera = camera
+        self.captured = captured
+        self.frame = captured.image
+        self.tracks = tracks
+        self.timestamp = captured.timestamp
+        self.inside_flags = []
+        self.vehicle_counts = {}
+        self.events = []
+        self.fps = camera.fps
+        self.timings = {}
+
+
+class Camera:
+    def __init__(self, config, tracker_args, class_names, crop_margin=None, redetect_interval=None,
+                 capture_process=False):
+        self.name = config.name
+        self.source = config.source
+        self.zones = config.zones
+        self.lines = config.lines
+        self.polygons = config.polygons
+        self.is_file = config.is_file
+        self.tracker = CameraTracker(tracker_args)
+        self.counter = VehicleCounter(class_names, self.zones, self.lines, self.tracker.max_age)
+        self.cap = None
+        # Decode in a separate process into a shared-memory ring instead of a thread
+        self.capture_process = capture_process
+
+        # ROI-cropped inference: None disables it, otherwise the margin in pixels
+        self.crop_margin = crop_margin
+        self.crop_region = None
+        self._crop_shape = None
+
+        # Motion gate: None disables it, otherwise the forced re-detect interval
+        self.redetect_interval = redetect_interval
+        self.gate = None
+
+        # Frame stride: detect every Nth frame, set by the quality controller
+        self.stride = 1
+        self.frame_index = 0
+
+        self.prev_frame_time = 0
+        self.fps = 0
+
+    def open(self, decode_observer=None):
+        print(f"[INFO] [{self.name}] Connecting to: {self.source}")
+        capture_cls = ProcessVideoCapture if self.capture_process else VideoCaptureThreading
+        self.cap = capture_cls(self.source, decode_observer=decode_observer)
+
+    def region_for(self, frame, imgsz):
+        # Built on the first frame and rebuilt only if the stream or the
+        # detector input size changes
+        if self.crop_margin is None:
+            return None
+        if (frame.shape[:2], imgsz) != self._crop_shape:
+            self._crop_shape = (frame.shape[:2], imgsz)
+            self.crop_region = build_crop_region(self.zones, self.lines, frame.shape[:2],
+                                                 imgsz, self.crop_margin)
+            if self.crop_region is not None:
+                print(f"[INFO] [{self.name}] {self.crop_region.describe()}")
+            else:
+                print(f"[INFO] [{self.name}] ROI crop not worth it, detecting on the full frame")
+        return self.crop_region
+
+    def needs_detection(self, frame):
+        self.frame_index += 1
+        if self.stride > 1 and self.frame_index % self.stride:
+            return False
+        if self.redetect_interval is None:
+            return True
+        if self.gate is None or self.gate.frame_shape != frame.shape[:2]:
+            self.gate = MotionGate(self.zones, self.lines, frame.shape, self.redetect_interval)
+        return self.gate.should_detect(frame)
+
+    @property
+    def finished(self):
+        return self.cap is None or not self.cap.opened or self.cap.finished
+
+    def tick_fps(self):
+        curr_time = time.time()
+        fps_instant = 1 / (curr_time - self.prev_frame_time) if self.prev_frame_time > 0 else 0
+        self.prev_frame_time = curr_time
+        self.fps = (FPS_SMOOTHING * self.fps) + ((1 - FPS_SMOOTHING) * fps_instant)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+# --- MULTI-CAMERA ENGINE ---
+# Every step takes the latest frame of each camera, runs one batched detector
+# call over all of them and feeds the detections to each camera's own tracker.
+# With ROI cropping, cameras are batched per input size instead. With the
+# motion gate, idle cameras skip detection and their tracks are predicted.
+class MultiCameraEngine:
+    def __init__(self, detector, camera_configs, tracker_config, crop_margin=None, redetect_interval=None,
+                 capture_processes=False):
+        self.detector = detector
+        self.class_names = detector.names
+        tracker_args = load_tracker_args(tracker_config)
+        self.cameras = [Camera(cfg, tracker_args, self.class_names, crop_margin, redetect_interval, capture_processes)
+                        for cfg in camera_configs]
+
+    def open(self, metrics=None):
+        # Streams connect in their capture threads/processes, so this returns
+        # right away and the caller can warm up the detector meanwhile
+        for cam in self.cameras:
+            cam.open(metrics.decode_observer(cam.name) if metrics is not None else None)
+
+    def wait_for_frames(self, timeout=FIRST_FRAME_TIMEOUT):
+        # Polls every camera until it delivered a first frame or the timeout
+        # expires; True if at least one camera is live
+        pending = [cam for cam in self.cameras if cam.cap.opened]
+        live = []
+        deadline = time.time() + timeout
+        next_notice = time.time() + 1.0
+        while pending and time.time() < deadline:
+            for cam in list(pending):
+                if cam.cap.read(timeout=FIRST_FRAME_POLL) is not None:
+                    pending.remove(cam)
+                    live.append(cam)
+                elif cam.cap.finished:
+                    # A file that ended before its first frame
+                    pending.remove(cam)
+                    print(f"[ERROR] [{cam.name}] No video feed received.")
+            if pending and time.time() >= next_notice:
+                print(f"[WARNING] Waiting for stream data from {len(pending)} camera(s)... "
+                      f"({max(0.0, deadline - time.time()):.0f}s left)")
+                next_notice += 1.0
+
+        for cam in pending:
+            print(f"[ERROR] [{cam.name}] No video feed received.")
+        return len(live) > 0
+
+    def start(self, timeout=FIRST_FRAME_TIMEOUT, metrics=None):
+        self.open(metrics)
+        return self.wait_for_frames(timeout)
+
+    def running(self):
+        return any(not cam.finished for cam in self.cameras)
+
+    def infer(self):
+        # Detection + tracking for the latest frame of every camera
+        batch = []
+        for cam in self.cameras:
+            if cam.cap is None:
+                continue
+            captured = cam.cap.read_latest()
+            if captured is not None:
+                batch.append((cam, captured))
+
+        if not batch:
+            time.sleep(IDLE_SLEEP)
+            return []
+
+        run = [cam.needs_detection(captured.image) for cam, captured in batch]
+        t0 = time.perf_counter()
+        detections = iter(self.detect([item for item, r in zip(batch, run) if r]))
+        inference_time = time.perf_counter() - t0
+
+        results = []
+        for (cam, captured), r in zip(batch, run):
+            t0 = time.perf_counter()
+            if r:
+                tracks = cam.tracker.update(next(detections), captured.image)
+            else:
+                tracks = cam.tracker.predict()
+            result = CameraResult(cam, captured, tracks)
+            result.timings['tracking'] = time.perf_counter() - t0
+            if r:
+                result.timings['inference'] = inference_time
+            cam.tick_fps()
+            results.append(result)
+        return results
+
+    def detect(self, batch):
+        # One detector call per input size; full frames share the default one
+        from ultralytics.engine.results import Boxes
+
+        if not batch:
+            return []
+        groups = {}
+        for i, (cam, captured) in enumerate(batch):
+            region = cam.region_for(captured.image, self.detector.imgsz)
+            key = None if region is None else region.imgsz
+            groups.setdefault(key, []).append((i, region))
+
+        detections = [None] * len(batch)
+        for imgsz, members in groups.items():
+            frames = [batch[i][1].image if region is None else region.crop(batch[i][1].image)
+                      for i, region in members]
+            for (i, region), det in zip(members, self.detector.detect(frames, imgsz)):
+                if region is not None:
+                    det = Boxes(region.to_frame(det.data), region.frame_shape)
+                detections[i] = det
+        return detections
+
+    def release(self, result):
+        # Hand the frame buffer back to the capture pool
+        result.captured.release()
+        result.frame = None
+
+    def count(self, result):
+        counter = result.camera.counter
+        result.inside_flags = counter.update(result.tracks)
+        # Snapshot, so later stages never read state the counter is mutating
+        result.vehicle_counts = dict(counter.vehicle_counts)
+        result.events = counter.new_events
+        return result
+
+    def capture_stats(self):
+        lines = []
+        for cam in self.cameras:
+            if cam.cap is None:
+                continue
+            st = cam.cap.stats()
+            state = "up" if st['connected'] else "DOWN"
+            line = (f"[CAPTURE] [{cam.name}] {state} frames={st['frames']} dropped={st['dropped']} "
+                    f"stale={st['stale']} reconnects={st['reconnects']}")
+            if cam.gate is not None:
+                line += f" detected={cam.gate.detected} gated={cam.gate.skipped}"
+            lines.append(line)
+        return lines
+
+    def step(self):
+        return [self.count(result) for result in self.infer()]
+
+    def stop(self):
+        for cam in self.cameras:
+            cam.release()
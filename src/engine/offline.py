@@ -0,0 +1,202 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from src.engine.crop import build_crop_region
+from src.engine.multicam import Camera
+
+DEFAULT_BATCH_SIZE = 16
+
+
+# --- SEGMENT DETECTION ---
+# Frame-index seeking is not frame-accurate for every file (H.264/HEVC with
+# B-frames or open GOPs, variable frame rate). A seek is only trusted if the
+# first frame read afterwards reports the expected frame number and timestamp;
+# otherwise the video is reopened and decoded forward from its first frame.
+def open_at(video_path, start):
+    # Returns (capture, first frame or None)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video: {video_path}")
+    if start > 0:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        ret, frame = cap.read()
+        landed = cap.get(cv2.CAP_PROP_POS_FRAMES) - 1
+        expected_ms = start * 1000.0 / fps if fps > 0 else None
+        if ret and landed == start and expected_ms is not None and \
+                abs(cap.get(cv2.CAP_PROP_POS_MSEC) - expected_ms) < 500.0 / fps:
+            return cap, frame
+
+        print(f"[WARNING] Seek to frame {start} of {video_path} is not exact, decoding forward instead")
+        cap.release()
+        cap = cv2.VideoCapture(video_path)
+        for _ in range(start):
+            if not cap.grab():
+                break
+    ret, frame = cap.read()
+    return cap, frame if ret else None
+
+
+# Decodes frames [start, end) of a video and runs the detector over them in
+# batches. Yields one (N, 6) array per frame: x1, y1, x2, y2, conf, cls.
+# With a CropRegion only the ROI crop is detected; boxes are in frame coordinates.
+def iter_segment_detections(detector, video_path, start, end, batch_size, region=None):
+    cap, frame = open_at(video_path, start)
+
+    def detect(batch):
+        if region is None:
+            return [np.asarray(boxes.data, dtype=np.float32).reshape(-1, 6)
+                    for boxes in detector.detect(batch)]
+        crops = [region.crop(frame) for frame in batch]
+        return [region.to_frame(boxes.data) for boxes in detector.detect(crops, region.imgsz)]
+
+    try:
+        batch = []
+        index = start
+        while frame is not None:
+            batch.append(frame)
+            index += 1
+            if len(batch) == batch_size:
+                yield from detect(batch)
+                batch = []
+            if end is not None and index >= end:
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+        if batch:
+            yield from detect(batch)
+    finally:
+        cap.release()
+
+
+def detect_segment(detector, video_path, start, end, batch_size, region=None):
+    return list(iter_segment_detections(detector, video_path, start, end, batch_size, region))
+
+
+def _detect_segment_worker(model_path, backend, conf, imgsz, video_path, start, end, batch_size, threads,
+                           region=None):
+    # Runs in a child process: one model copy and a share of the CPU threads each
+    import torch
+    from src.engine.detector import Detector
+
+    torch.set_num_threads(threads)
+    detector = Detector(model_path, conf=conf, imgsz=imgsz, backend=backend)
+    return detect_segment(detector, video_path, start, end, batch_size, region)
+
+
+def plan_segments(frame_count, workers, batch_size):
+    # Segment lengths are multiples of batch_size, so every batch holds the
+    # same frames as in a sequential run and detections are identical
+    # (provided every segment starts at its exact frame, see open_at)
+    if workers <= 1 or frame_count <= batch_size:
+        return [(0, None)]
+    batches = -(-frame_count // batch_size)
+    per_worker = -(-batches // workers)
+    segments = []
+    for start_batch in range(0, batches, per_worker):
+        start = start_batch * batch_size
+        end = (start_batch + per_worker) * batch_size
+        segments.append((start, end))
+    # The last segment reads until EOF, the frame count is only an estimate
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def replay_detections(camera, detections, frame_size):
+    # Tracks and counts stored per-frame detections on a camera, yielding the
+    # counting events of every frame
+    from ultralytics.engine.results import Boxes
+
+    for data in detections:
+        tracks = camera.tracker.update(Boxes(data, frame_size), None)
+        camera.counter.update(tracks)
+        yield camera.counter.new_events
+
+
+# --- OFFLINE FILE MODE ---
+# Recorded footage: every frame is decoded and detected (nothing is dropped),
+# in batches, optionally with the video split into segments that are detected
+# in parallel processes. Tracking and counting then replay the detections in
+# frame order in this process, so tracks are stitched across segment
+# boundaries for free and the report equals a sequential run.
+class OfflineRunner:
+    def __init__(self, detector, tracker_args, batch_size=DEFAULT_BATCH_SIZE, workers=1, crop_margin=None):
+        self.detector = detector
+        self.tracker_args = tracker_args
+        self.batch_size = batch_size
+        self.workers = workers
+        self.crop_margin = crop_margin
+
+    def probe(self, video_path):
+        cap = cv2.VideoCapture(video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        return frame_count, frame_size, fps
+
+    def crop_region(self, camera_config, frame_size):
+        if self.crop_margin is None:
+            return None
+        region = build_crop_region(camera_config.zones, camera_config.lines, frame_size,
+                                   self.detector.imgsz, self.crop_margin)
+        if region is not None:
+            print(f"[INFO] [{camera_config.name}] {region.describe()}")
+        return region
+
+    def iter_detections(self, video_path, frame_count, region=None):
+        # Per-frame detections in frame order. A sequential run streams them;
+        # a sharded run holds at most the finished segments not yet replayed.
+        segments = plan_segments(frame_count, self.workers, self.batch_size)
+        if len(segments) == 1:
+            yield from iter_segment_detections(self.detector, video_path, 0, None, self.batch_size, region)
+            return
+
+        threads = max(1, (os.cpu_count() or 1) // len(segments))
+        print(f"[INFO] Detecting {frame_count} frames in {len(segments)} segments "
+              f"({threads} thread(s) per worker)")
+        with ProcessPoolExecutor(max_workers=len(segments)) as pool:
+            futures = [
+                pool.submit(_detect_segment_worker, self.detector.model_path, self.detector.backend,
+                            self.detector.conf, self.detector.imgsz, video_path, start, end,
+                            self.batch_size, threads, region)
+                for start, end in segments
+            ]
+            for i, future in enumerate(futures):
+                segment = future.result()
+                futures[i] = None  # free each segment once it has been replayed
+                yield from segment
+
+    def replay_tracker_args(self):
+        # Tracking replays stored detections without frames, so BoT-SORT's
+        # camera motion compensation is switched off (same for every run)
+        args = self.tracker_args
+        if args.tracker_type == 'botsort' and getattr(args, 'gmc_method', None) not in (None, 'none'):
+            print("[WARNING] Offline mode disables BoT-SORT camera motion compensation.")
+            args = SimpleNamespace(**{**vars(args), 'gmc_method': 'none'})
+        return args
+
+    def run(self, camera_config, class_names, count_store=None, start_time=None):
+        camera = Camera(camera_config, self.replay_tracker_args(), class_names)
+        start_time = time.time() if start_time is None else start_time
+        frame_count, frame_size, fps = self.probe(camera_config.source)
+        region = self.crop_region(camera_config, frame_size)
+
+        t0 = time.time()
+        frames = 0
+        detections = self.iter_detections(camera_config.source, frame_count, region)
+        for frame_index, events in enumerate(replay_detections(camera, detections, frame_size)):
+            if count_store is not None:
+                count_store.record(camera.name, start_time + frame_index / fps, events)
+            frames += 1
+        elapsed = time.time() - t0
+
+        print(f"[INFO] [{camera.name}] {frames} frames in {elapsed:.1f}s "
+              f"({frames / max(elapsed, 1e-6):.1f} fps, {frames / fps / max(elapsed, 1e-6):.1f}x realtime)")
+        return camera
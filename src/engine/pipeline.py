@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+
+DROP_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+POLL_TIMEOUT = 0.1
+
+
+# --- BOUNDED HAND-OFF QUEUE ---
+# block       : producer waits for room (nothing is lost, back-pressure upstream)
+# drop_oldest : the oldest queued item is discarded to make room (keeps latency low)
+# drop_newest : the incoming item is discarded when the queue is full
+class StageQueue:
+    def __init__(self, name, maxsize=8, policy='block'):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}', expected one of {DROP_POLICIES}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.q = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.peak_depth = 0
+
+    def put(self, item, stop_event):
+        if self.policy == 'block':
+            while not stop_event.is_set():
+                try:
+                    self.q.put(item, timeout=POLL_TIMEOUT)
+                    break
+                except queue.Full:
+                    continue
+        elif self.policy == 'drop_oldest':
+            while True:
+                try:
+                    self.q.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.q.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            try:
+                self.q.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+        self.peak_depth = max(self.peak_depth, self.q.qsize())
+
+    def get(self, timeout=POLL_TIMEOUT):
+        try:
+            return True, self.q.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+    def depth(self):
+        return self.q.qsize()
+
+    def empty(self):
+        return self.q.empty()
+
+
+# --- PIPELINE STAGE ---
+# A source stage (in_queue=None) calls func() repeatedly until it returns None.
+# Other stages call func(item) for every item from their input queue.
+# func returns a list of items for the next queue (may be empty).
+class Stage:
+    def __init__(self, name, func, in_queue=None, out_queue=None, upstream=None):
+        self.name = name
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.upstream = upstream
+        self.stop_event = None
+        self.done = threading.Event()
+        self.error = None
+        self.thread = None
+
+        self.processed = 0
+        self.busy_time = 0.0
+
+    def start(self, stop_event):
+        self.stop_event = stop_event
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _upstream_done(self):
+        return self.upstream is not None and self.upstream.done.is_set()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.in_queue is None:
+                    t0 = time.perf_counter()
+                    outputs = self.func()
+                    if outputs is None:
+                        break
+                else:
+                    ret, item = self.in_queue.get()
+                    if not ret:
+                        if self._upstream_done() and self.in_queue.empty():
+                            break
+                        continue
+                    t0 = time.perf_counter()
+                    outputs = self.func(item)
+
+                # Every consumed item counts, even if it produces no output;
+                # a source only counts when it produced something
+                if outputs or self.in_queue is not None:
+                    self.busy_time += time.perf_counter() - t0
+                    self.processed += 1
+                if outputs and self.out_queue is not None:
+                    for out in outputs:
+                        self.out_queue.put(out, self.stop_event)
+        except Exception as e:
+            self.error = e
+            print(f"[ERROR] Pipeline stage '{self.name}' failed: {e}")
+            self.stop_event.set()
+        finally:
+            self.done.set()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+# --- STAGED PIPELINE ---
+class Pipeline:
+    def __init__(self, stats_interval=5.0, extra_stats=None):
+        # extra_stats: optional callable returning more lines for the report
+        self.extra_stats = extra_stats
+        self.stages = []
+        self.queues = []
+        self.stop_event = threading.Event()
+        self.stats_interval = stats_interval
+        self._last_stats = time.time()
+        self._last_processed = {}
+
+    def add_source(self, name, func):
+        stage = Stage(name, func)
+        self.stages.append(stage)
+        return stage
+
+    def add_stage(self, name, func, maxsize=8, policy='block'):
+        in_queue = self.add_queue(name, maxsize, policy)
+        stage = Stage(name, func, in_queue=in_queue, upstream=self.stages[-1])
+        self.stages.append(stage)
+        return stage
+
+    def add_queue(self, name, maxsize=8, policy='block'):
+        # Connects the last stage to a new queue and returns it
+        q = StageQueue(name, maxsize, policy)
+        self.stages[-1].out_queue = q
+        self.queues.append(q)
+        return q
+
+    def start(self):
+        for stage in self.stages:
+            stage.start(self.stop_event)
+
+    def finished(self):
+        return self.stop_event.is_set() or self.stages[-1].done.is_set()
+
+    def stop(self):
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout=2.0)
+
+    def stats(self):
+        now = time.time()
+        elapsed = max(now - self._last_stats, 1e-6)
+        lines = []
+        for stage in self.stages:
+            processed = stage.processed - self._last_processed.get(stage.name, 0)
+            self._last_processed[stage.name] = stage.processed
+            busy_ms = (stage.busy_time / stage.processed * 1000) if stage.processed else 0.0
+            line = f"{stage.name}: {processed / elapsed:.1f}/s busy {busy_ms:.1f}ms"
+            if stage.in_queue is not None:
+                q = stage.in_queue
+                line += f" q={q.depth()}/{q.maxsize} peak={q.peak_depth} drop={q.dropped}"
+            lines.append(line)
+        # Queues drained outside the pipeline (e.g. the display loop)
+        consumed = [stage.in_queue for stage in self.stages]
+        for q in self.queues:
+            if q not in consumed:
+                lines.append(f"{q.name}: q={q.depth()}/{q.maxsize} peak={q.peak_depth} drop={q.dropped}")
+        self._last_stats = now
+        return " | ".join(lines)
+
+    def maybe_print_stats(self):
+        if time.time() - self._last_stats >= self.stats_interval:
+            print(f"[PIPELINE] {self.stats()}")
+            if self.extra_stats is not None:
+                for line in self.extra_stats():
+                    print(line)
@@ -0,0 +1,208 @@
+import re
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# --- PUBLISHER CONFIG ---
+FFMPEG_BIN = "ffmpeg"
+PUBLISH_URL = "rtsp://localhost:8554"   # local MediaMTX (tools/mediamtx.yml)
+PUBLISH_SUFFIX = "_annotated"
+PUBLISH_FPS = 15
+PUBLISH_WIDTH = 1280
+RESTART_BACKOFF_INITIAL = 1.0
+RESTART_BACKOFF_MAX = 30.0
+
+# libx264 tuned for live viewing: no B-frames or lookahead, a keyframe every
+# second so new viewers start quickly
+ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'zerolatency',
+                '-pix_fmt', 'yuv420p', '-bf', '0']
+
+
+def stream_path(camera_name):
+    # MediaMTX path for a camera, e.g. 'Cam 1' -> 'Cam_1_annotated'
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', camera_name) + PUBLISH_SUFFIX
+
+
+def output_size(frame_shape, width):
+    # Keep the aspect ratio, both sides even (yuv420p)
+    h, w = frame_shape[:2]
+    width = min(width, w) // 2 * 2
+    height = max(2, int(round(h * width / w / 2)) * 2)
+    return width, height
+
+
+def encoder_command(url, size, fps):
+    width, height = size
+    return [FFMPEG_BIN, '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            *ENCODER_ARGS, '-g', str(max(1, int(fps))),
+            '-f', 'rtsp', '-rtsp_transport', 'tcp', url]
+
+
+# --- RTSP PUBLISHER ---
+# Annotated frames of one camera go to an ffmpeg subprocess that encodes them
+# and publishes them on MediaMTX. submit() never blocks. A frame already at the
+# stream size is handed over by reference, so the caller must not modify it
+# afterwards (rendered frames are never reused). Other frames are resized into
+# one of two preallocated buffers, the one the writer is not sending. A writer
+# thread pipes the newest frame to ffmpeg's stdin at a fixed rate, straight
+# from the array's memory. If the encoder falls behind, the pending frame is
+# replaced and counted as dropped; if no new frame arrived, the last one is
+# repeated so the stream keeps a constant frame rate. The encoder is restarted
+# when it exits.
+class StreamPublisher:
+    def __init__(self, name, url, width=PUBLISH_WIDTH, fps=PUBLISH_FPS):
+        self.name = name
+        self.url = url
+        self.width = width
+        self.fps = fps
+        self.size = None
+        self.submitted = 0
+        self.published = 0
+        self.dropped = 0
+        self.restarts = 0
+        self.connected = False
+
+        self._buffers = None
+        self._pending = None    # newest frame not sent yet
+        self._current = None    # frame the writer sends (and repeats)
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._proc = None
+        self._thread = None
+
+    def submit(self, frame):
+        with self._cond:
+            if self._stopped:
+                return
+            if self.size is None:
+                self._setup(frame.shape)
+            if self._pending is not None:
+                self.dropped += 1
+            if frame.shape[1::-1] == self.size and frame.dtype == np.uint8 and frame.flags.c_contiguous:
+                self._pending = frame
+            else:
+                dst = self._buffers[0] if self._buffers[0] is not self._current else self._buffers[1]
+                self._pending = cv2.resize(frame, self.size, dst=dst, interpolation=cv2.INTER_AREA)
+            self.submitted += 1
+            self._cond.notify()
+
+    def _setup(self, frame_shape):
+        self.size = output_size(frame_shape, self.width)
+        width, height = self.size
+        self._buffers = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self._thread = threading.Thread(target=self._run, name=f"publish-{self.name}", daemon=True)
+        self._thread.start()
+        print(f"[INFO] [{self.name}] Publishing {width}x{height}@{self.fps} to {self.url}")
+
+    def _start_encoder(self):
+        try:
+            self._proc = subprocess.Popen(encoder_command(self.url, self.size, self.fps),
+                                          stdin=subprocess.PIPE, bufsize=0)
+        except OSError as e:
+            print(f"[ERROR] [{self.name}] Cannot start encoder '{FFMPEG_BIN}': {e}")
+            self._proc = None
+            return False
+        return True
+
+    def _stop_encoder(self):
+        proc, self._proc = self._proc, None
+        self.connected = False
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def _write(self, image):
+        # Raw buffer write, looping over partial writes of the unbuffered pipe
+        view = memoryview(image).cast('B')
+        while view:
+            written = self._proc.stdin.write(view)
+            view = view[written:]
+
+    def _next_frame(self, deadline):
+        # Takes the newest frame at the next tick; submit() never writes into
+        # the frame this thread is sending
+        with self._cond:
+            while not self._stopped and self._current is None and self._pending is None:
+                self._cond.wait()
+            timeout = deadline - time.perf_counter()
+            while not self._stopped and timeout > 0:
+                self._cond.wait(timeout)
+                timeout = deadline - time.perf_counter()
+            if self._stopped:
+                return None
+            if self._pending is not None:
+                self._current, self._pending = self._pending, None
+            return self._current
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        backoff = RESTART_BACKOFF_INITIAL
+        deadline = time.perf_counter()
+        while not self._stopped:
+            if self._proc is None:
+                if not self._start_encoder():
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopped, backoff)
+                    backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                    continue
+
+            image = self._next_frame(deadline)
+            if image is None:
+                break
+            try:
+                self._write(image)
+            except (BrokenPipeError, ValueError, OSError) as e:
+                code = self._proc.poll()
+                self._stop_encoder()
+                if self._stopped:
+                    break
+                print(f"[WARNING] [{self.name}] Encoder stopped (exit code {code}): {e}. "
+                      f"Restarting in {backoff:.1f}s...")
+                self.restarts += 1
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped, backoff)
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                deadline = time.perf_counter()
+                continue
+
+            self.published += 1
+            self.connected = True
+            backoff = RESTART_BACKOFF_INITIAL
+            # Encoder behind schedule: skip the missed ticks instead of bursting
+            deadline = max(deadline + interval, time.perf_counter())
+
+        self._stop_encoder()
+
+    def stats(self):
+        return {
+            'connected': self.connected,
+            'submitted': self.submitted,
+            'published': self.published,
+            'dropped': self.dropped,
+            'restarts': self.restarts,
+        }
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is None:
+            return
+        self._thread.join(timeout=2)
+        proc = self._proc
+        if self._thread.is_alive() and proc is not None:
+            # Writer stuck on a stalled encoder: killing it unblocks the write
+            proc.kill()
+            self._thread.join(timeout=2)
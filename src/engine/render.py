@@ -0,0 +1,190 @@
+import cv2
+import numpy as np
+
+# --- VISUALIZATION CONFIG ---
+ROI_COLOR = (255, 0, 0)
+ROI_ALPHA = 0.3
+LINE_COLOR = (255, 0, 255)
+TEXT_COLOR = (255, 255, 255)
+TEXT_COUNTED_COLOR = (0, 0, 255) # Red color for counted vehicles
+DEFAULT_COLOR = (255, 255, 255)
+
+CLASS_COLOR_MAP = {
+    'car': (0, 255, 0),
+    'bus': (255, 0, 0),
+    'truck': (0, 51, 102),
+    'motor': (0, 255, 255)
+}
+
+
+def get_text_metrics(frame_width):
+    font_scale = max(0.5, frame_width / 1500)
+    line_height = int(font_scale * 40)
+    return font_scale, line_height
+
+
+def scale_polygons(polygons, scale):
+    return [np.round(np.asarray(p, dtype=np.float64) * scale).astype(np.int32) for p in polygons]
+
+
+def draw_tracks(frame, tracks, inside_flags, class_names, scale=1.0):
+    # `scale` maps source coordinates onto a resized frame
+    boxes = tracks.boxes * scale if scale != 1.0 else tracks.boxes
+    label_scale = 0.6 * scale
+    thickness = max(1, round(2 * scale))
+
+    for box, track_id, cls, is_inside in zip(boxes, tracks.ids.tolist(), tracks.clss.tolist(), inside_flags):
+        x1, y1, x2, y2 = box
+        cls_name = class_names.get(cls, str(cls))
+
+        box_color = CLASS_COLOR_MAP.get(cls_name, DEFAULT_COLOR)
+        text_draw_color = box_color
+
+        # Tracks inside the ROI are always counted by the time they are drawn
+        if is_inside:
+            text_draw_color = TEXT_COUNTED_COLOR
+
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), box_color, thickness)
+        label = f"ID:{track_id} {cls_name}"
+        cv2.putText(frame, label, (int(x1), int(y1) - int(10 * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, label_scale, text_draw_color, thickness)
+
+
+# --- CACHED OVERLAY COMPOSITOR ---
+# The ROI layer and the dashboard panel backgrounds never change for a given
+# resolution, so they are built once and only the pixels inside their bounding
+# rectangles are blended, reusing preallocated buffers. Output is identical to
+# blending full-frame copies.
+class Compositor:
+    def __init__(self, polygons, lines=()):
+        self.polygons = [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons]
+        self.lines = [np.asarray(l, dtype=np.int32).reshape(2, 2) for l in lines]
+        self._key = None
+
+    def _build(self, frame_shape, num_classes):
+        frame_height, frame_width = frame_shape[:2]
+        font_scale, line_height = get_text_metrics(frame_width)
+        self.font_scale = font_scale
+        self.line_height = line_height
+
+        # ROI layer, limited to the polygons' bounding rect (+ outline thickness)
+        self.roi_rect = None
+        if self.polygons:
+            points = np.concatenate(self.polygons)
+            x0, y0 = np.maximum(points.min(axis=0) - 2, 0)
+            x1, y1 = np.minimum(points.max(axis=0) + 3, (frame_width, frame_height))
+            if x1 > x0 and y1 > y0:
+                shifted = [p - (x0, y0) for p in self.polygons]
+                self.roi_mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+                cv2.fillPoly(self.roi_mask, shifted, 255)
+                cv2.polylines(self.roi_mask, shifted, isClosed=True, color=255, thickness=2)
+                self.roi_layer = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+                self.roi_layer[:] = ROI_COLOR
+                self.roi_buffer = np.empty_like(self.roi_layer)
+                self.roi_rect = (x0, y0, x1, y1)
+
+        # Panel rects (cv2.rectangle includes the end point, hence the +1)
+        self.fps_box_width = int(frame_width * 0.12)
+        self.fps_rect = (0, 0, min(self.fps_box_width + 1, frame_width), min(line_height + 1, frame_height))
+
+        self.box_width = int(frame_width * 0.15)
+        self.start_x = frame_width - self.box_width
+        box_height = (num_classes * line_height) + int(line_height / 2)
+        self.stats_rect = (self.start_x, 0, frame_width, min(box_height + 1, frame_height))
+
+        self.panel_backgrounds = {}
+        for rect in (self.fps_rect, self.stats_rect):
+            x0, y0, x1, y1 = rect
+            self.panel_backgrounds[rect] = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+
+    def _ensure(self, frame, num_classes):
+        key = (frame.shape, num_classes)
+        if key != self._key:
+            self._build(frame.shape, num_classes)
+            self._key = key
+
+    def _blend_panel(self, frame, rect):
+        x0, y0, x1, y1 = rect
+        if x1 <= x0 or y1 <= y0:
+            return
+        region = frame[y0:y1, x0:x1]
+        cv2.addWeighted(self.panel_backgrounds[rect], 0.6, region, 0.4, 0, dst=region)
+
+    def draw_roi(self, frame, num_classes=0):
+        self._ensure(frame, num_classes)
+        if self.roi_rect is not None:
+            x0, y0, x1, y1 = self.roi_rect
+            region = frame[y0:y1, x0:x1]
+            cv2.addWeighted(self.roi_layer, ROI_ALPHA, region, 1 - ROI_ALPHA, 0, dst=self.roi_buffer)
+            cv2.copyTo(self.roi_buffer, self.roi_mask, region)
+
+        # Counting lines, the arrow points from A to B
+        for (ax, ay), (bx, by) in self.lines:
+            cv2.arrowedLine(frame, (int(ax), int(ay)), (int(bx), int(by)), LINE_COLOR, 2, tipLength=0.02)
+
+    def draw_dashboard(self, frame, fps, vehicle_counts):
+        self._ensure(frame, len(vehicle_counts))
+        font_scale = self.font_scale
+        line_height = self.line_height
+
+        # FPS
+        fps_text = f"FPS: {int(fps)}"
+        self._blend_panel(frame, self.fps_rect)
+        cv2.putText(frame, fps_text, (int(self.fps_box_width * 0.1), int(line_height * 0.75)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 0), 2)
+
+        # Statistics
+        self._blend_panel(frame, self.stats_rect)
+
+        y_off = line_height
+        for k, v in vehicle_counts.items():
+            text = f"{k.capitalize()}: {v}"
+            cv2.putText(frame, text, (self.start_x + int(self.box_width*0.1), y_off),
+                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, 2)
+            y_off += line_height
+
+
+# --- PER-CAMERA RENDERER ---
+# source  : draw on the full-resolution frame, then resize for display
+# display : resize first, then draw scaled coordinates on the small frame
+RENDER_MODES = ('source', 'display', 'headless')
+
+
+class CameraRenderer:
+    def __init__(self, polygons, class_names, mode='display', display_width=1280, lines=()):
+        if mode not in ('source', 'display'):
+            raise ValueError(f"CameraRenderer does not draw in '{mode}' mode")
+        self.polygons = polygons
+        self.lines = lines
+        self.class_names = class_names
+        self.mode = mode
+        self.display_width = display_width
+        self.compositor = None
+        self.display_size = None
+        self.scale = 1.0
+
+    def _setup(self, frame):
+        orig_h, orig_w = frame.shape[:2]
+        self.display_size = (self.display_width, int(orig_h * (self.display_width / orig_w)))
+        if self.mode == 'display':
+            self.scale = self.display_width / orig_w
+            self.compositor = Compositor(scale_polygons(self.polygons, self.scale),
+                                         scale_polygons(self.lines, self.scale))
+        else:
+            self.compositor = Compositor(self.polygons, self.lines)
+
+    def render(self, result):
+        frame = result.frame
+        if self.display_size is None:
+            self._setup(frame)
+
+        if self.mode == 'display':
+            frame = cv2.resize(frame, self.display_size)
+
+        self.compositor.draw_roi(frame, len(result.vehicle_counts))
+        draw_tracks(frame, result.tracks, result.inside_flags, self.class_names, self.scale)
+        self.compositor.draw_dashboard(frame, result.fps, result.vehicle_counts)
+
+        if self.mode == 'source':
+            frame = cv2.resize(frame, self.display_size)
+        return frame
@@ -0,0 +1,393 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from src.engine.capture import (MAX_READ_FAILURES, POOL_SIZE, RECONNECT_BACKOFF_INITIAL, RECONNECT_BACKOFF_MAX,
+                                READ_TIMEOUT_MS, STALE_AFTER, CapturedFrame, open_capture)
+
+# --- SHARED MEMORY LAYOUT ---
+# Control block, one per camera, int64 fields:
+LATEST, SEQ, FRAMES, DROPPED, RECONNECTS, CONNECTED, FINISHED = range(7)
+CTRL_FIELDS = 7
+# Frame ring, recreated when the frame size changes: a float64 slot table
+# (state, seq, timestamp, pts_ms, decode_s per slot) followed by the frames
+STATE, SLOT_SEQ, TIMESTAMP, PTS, DECODE = range(5)
+SLOT_FIELDS = 5
+FREE, WRITING, PUBLISHED, HELD = range(4)
+ALIGN = 64
+OPEN_WAIT = 15.0              # seconds to wait for a capture process to open a file
+
+
+class FrameRing:
+    # Slot table and frame buffers of one camera in a single shared memory
+    # segment. The inference process creates it, the capture process attaches.
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(int(v) for v in shape)
+        self.slots = slots
+        self.frame_offset = -(-slots * SLOT_FIELDS * 8 // ALIGN) * ALIGN
+        size = self.frame_offset + slots * int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size if name is None else 0)
+        self.table = np.ndarray((slots, SLOT_FIELDS), dtype=np.float64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=self.frame_offset)
+        if name is None:
+            self.table[:] = 0
+        self.held = 0
+        self.retired = False
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self, unlink=False):
+        self.table = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a frame view is still referenced somewhere, the mapping goes with it
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# --- CAPTURE PROCESS ---
+# Runs in its own process: opens the source, decodes straight into free ring
+# slots and publishes every frame with a sequence number and timestamps. Only
+# slot bookkeeping is done under the shared condition; pixels are never copied
+# or pickled. The same reconnect and drop rules as VideoCaptureThreading apply.
+class _CaptureWorker:
+    def __init__(self, src, is_file, slots, ctrl_name, cond, stop_event, conn):
+        self.src = src
+        self.is_file = is_file
+        self.slots = slots
+        self.cond = cond
+        self.stop_event = stop_event
+        self.conn = conn
+        self.ctrl_shm = shared_memory.SharedMemory(name=ctrl_name)
+        self.ctrl = np.ndarray((CTRL_FIELDS,), dtype=np.int64, buffer=self.ctrl_shm.buf)
+        self.cap = None
+        self.ring = None
+
+    def _reconnect(self):
+        backoff = RECONNECT_BACKOFF_INITIAL
+        while not self.stop_event.is_set():
+            if self.cap is not None:
+                self.cap.release()
+            self.cap = open_capture(self.src)
+            if self.cap is not None:
+                self.ctrl[CONNECTED] = 1
+                return True
+            print(f"[WARNING] Reconnect to {self.src} failed, retrying in {backoff:.1f}s")
+            self.stop_event.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        return False
+
+    def _new_ring(self, shape):
+        # The inference process allocates the ring; the old one is dropped
+        if self.ring is not None:
+            self.ring.close()
+        self.conn.send(('format', tuple(shape)))
+        self.ring = FrameRing(shape, self.slots, self.conn.recv())
+
+    def _claim(self):
+        with self.cond:
+            free = np.flatnonzero(self.ring.table[:, STATE] == FREE)
+            if len(free) == 0:
+                return None
+            slot = int(free[0])
+            self.ring.table[slot, STATE] = WRITING
+            return slot
+
+    def _publish(self, slot, decode_s):
+        ts = time.time()
+        pts_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        table = self.ring.table
+        with self.cond:
+            latest = int(self.ctrl[LATEST])
+            if latest >= 0 and table[latest, STATE] == PUBLISHED:
+                table[latest, STATE] = FREE
+                self.ctrl[DROPPED] += 1
+            self.ctrl[SEQ] += 1
+            table[slot] = (PUBLISHED, self.ctrl[SEQ], ts, pts_ms, decode_s)
+            self.ctrl[LATEST] = slot
+            self.ctrl[FRAMES] += 1
+            self.cond.notify_all()
+
+    def _release_slot(self, slot):
+        with self.cond:
+            self.ring.table[slot, STATE] = FREE
+
+    def _step(self):
+        # One frame; returns False if the read failed
+        if self.ring is None:
+            t0 = time.perf_counter()
+            ret, image = self.cap.read()
+            if not ret:
+                return False
+            self._new_ring(image.shape)
+            slot = self._claim()
+            self.ring.frames[slot] = image
+            self._publish(slot, time.perf_counter() - t0)
+            return True
+
+        slot = self._claim()
+        if slot is None:
+            # Every slot is held by the inference side: skip decoding
+            ret = self.cap.grab()
+            if ret:
+                with self.cond:
+                    self.ctrl[DROPPED] += 1
+            return ret
+
+        buf = self.ring.frames[slot]
+        t0 = time.perf_counter()
+        ret, image = self.cap.read(buf)
+        decode_s = time.perf_counter() - t0
+        if not ret:
+            del buf
+            self._release_slot(slot)
+            return False
+        if image is not buf:
+            # The frame size changed: move to a ring of the new size
+            del buf
+            self._release_slot(slot)
+            self._new_ring(image.shape)
+            slot = self._claim()
+            self.ring.frames[slot] = image
+        else:
+            del buf
+        self._publish(slot, decode_s)
+        return True
+
+    def run(self):
+        self.cap = open_capture(self.src)
+        if self.is_file:
+            self.conn.send(('opened', self.cap is not None))
+            if self.cap is None:
+                return
+        elif self.cap is None and not self._reconnect():
+            return
+        self.ctrl[CONNECTED] = 1
+        failures = 0
+        parent = mp.parent_process()
+
+        while not self.stop_event.is_set():
+            if parent is not None and not parent.is_alive():
+                break
+            if self._step():
+                failures = 0
+                continue
+
+            # A local file does not come back, a stream might
+            if self.is_file:
+                break
+
+            failures += 1
+            if failures >= MAX_READ_FAILURES:
+                print(f"[WARNING] Stream {self.src} lost, reconnecting...")
+                self.ctrl[CONNECTED] = 0
+                if not self._reconnect():
+                    break
+                with self.cond:
+                    self.ctrl[RECONNECTS] += 1
+                failures = 0
+            else:
+                time.sleep(0.01)
+
+    def close(self):
+        with self.cond:
+            self.ctrl[FINISHED] = 1
+            self.cond.notify_all()
+        if self.cap is not None:
+            self.cap.release()
+        if self.ring is not None:
+            self.ring.close()
+        self.ctrl = None
+        self.ctrl_shm.close()
+
+
+def _capture_main(src, is_file, slots, ctrl_name, cond, stop_event, conn):
+    worker = _CaptureWorker(src, is_file, slots, ctrl_name, cond, stop_event, conn)
+    try:
+        worker.run()
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        worker.close()
+
+
+# --- PROCESS VIDEO CAPTURE ---
+# Drop-in for VideoCaptureThreading with decoding in a separate process, so
+# several 1080p streams decode on separate cores instead of sharing the GIL
+# with inference, tracking and drawing. read() hands out zero-copy views into
+# the shared ring; a slot is reused once its CapturedFrame is released.
+# Decode times are reported to decode_observer for the frames that are read.
+class ProcessVideoCapture:
+    def __init__(self, src, pool_size=POOL_SIZE, decode_observer=None):
+        self.src = src
+        self.decode_observer = decode_observer
+        self.is_file = isinstance(src, str) and os.path.isfile(src)
+        self.pool_size = pool_size
+        self.opened = False
+        self.stale = 0
+
+        ctx = mp.get_context('spawn')
+        self.cond = ctx.Condition()
+        self.stop_event = ctx.Event()
+        self.ctrl_shm = shared_memory.SharedMemory(create=True, size=CTRL_FIELDS * 8)
+        self.ctrl = np.ndarray((CTRL_FIELDS,), dtype=np.int64, buffer=self.ctrl_shm.buf)
+        self.ctrl[:] = 0
+        self.ctrl[LATEST] = -1
+        self.ring = None
+        self.rings = []
+        self.lock = threading.Lock()
+        self._opened_event = threading.Event()
+        self._open_ok = False
+
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_capture_main, name=f"capture-{src}", daemon=True,
+                                   args=(src, self.is_file, pool_size, self.ctrl_shm.name,
+                                         self.cond, self.stop_event, child_conn))
+        self.process.start()
+        child_conn.close()
+        self.t = threading.Thread(target=self._control, name=f"capture-control-{src}", daemon=True)
+        self.t.start()
+
+        # Files must open right away; streams keep retrying in the capture process
+        if self.is_file:
+            self._opened_event.wait(OPEN_WAIT)
+            if not self._open_ok:
+                print(f"[ERROR] Failed to open connection to: {src}")
+                self.release()
+                return
+        self.opened = True
+
+    def _control(self):
+        # Serves ring allocations for the capture process until it exits
+        while True:
+            try:
+                kind, value = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'opened':
+                self._open_ok = value
+                self._opened_event.set()
+            elif kind == 'format':
+                ring = FrameRing(value, self.pool_size)
+                with self.cond:
+                    # A frame of the old size that nobody read is dropped
+                    if self.ctrl[LATEST] >= 0:
+                        self.ctrl[DROPPED] += 1
+                        self.ctrl[LATEST] = -1
+                    old, self.ring = self.ring, ring
+                with self.lock:
+                    self.rings.append(ring)
+                    if old is not None:
+                        old.retired = True
+                        self._close_if_unused(old)
+                self.conn.send(ring.name)
+        self._opened_event.set()
+
+    def _close_if_unused(self, ring):
+        # Called with self.lock held
+        if ring.retired and ring.held == 0 and ring in self.rings:
+            self.rings.remove(ring)
+            ring.close(unlink=True)
+
+    @property
+    def finished(self):
+        return self.ctrl is None or bool(self.ctrl[FINISHED]) and self.ctrl[LATEST] < 0
+
+    def _release_frame(self, ring, slot):
+        with self.cond:
+            if ring.table is not None and not ring.retired:
+                ring.table[slot, STATE] = FREE
+        with self.lock:
+            ring.held -= 1
+            self._close_if_unused(ring)
+
+    def _take(self):
+        # Called with self.cond held
+        slot = int(self.ctrl[LATEST])
+        if slot < 0:
+            return None
+        ring = self.ring
+        self.ctrl[LATEST] = -1
+        ring.table[slot, STATE] = HELD
+        _, seq, ts, pts_ms, decode_s = ring.table[slot]
+        with self.lock:
+            ring.held += 1
+        if time.time() - ts > STALE_AFTER:
+            self.stale += 1
+        frame = CapturedFrame(ring.frames[slot], ts, pts_ms, int(seq), lambda: self._release_frame(ring, slot))
+        return frame, decode_s
+
+    def _observe(self, taken):
+        if taken is None:
+            return None
+        frame, decode_s = taken
+        if self.decode_observer is not None:
+            self.decode_observer(decode_s)
+        return frame
+
+    def read(self, timeout=1):
+        if not self.opened:
+            return None
+        with self.cond:
+            if self.ctrl[LATEST] < 0 and not self.ctrl[FINISHED]:
+                self.cond.wait(timeout)
+            taken = self._take()
+        return self._observe(taken)
+
+    def read_latest(self):
+        if not self.opened:
+            return None
+        with self.cond:
+            taken = self._take()
+        return self._observe(taken)
+
+    def stats(self):
+        ctrl = self.ctrl
+        if ctrl is None:
+            return {'frames': 0, 'dropped': 0, 'stale': self.stale, 'reconnects': 0,
+                    'connected': False, 'buffers_in_use': 0}
+        with self.lock:
+            in_use = sum(ring.held for ring in self.rings)
+        return {
+            'frames': int(ctrl[FRAMES]),
+            'dropped': int(ctrl[DROPPED]),
+            'stale': self.stale,
+            'reconnects': int(ctrl[RECONNECTS]),
+            'connected': bool(ctrl[CONNECTED]),
+            'buffers_in_use': in_use,
+        }
+
+    def release(self):
+        if self.ctrl is None:
+            return
+        self.opened = False
+        self.stop_event.set()
+        self.process.join(timeout=READ_TIMEOUT_MS / 1000 + 1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.t.join(timeout=1)
+        with self.lock:
+            for ring in self.rings:
+                ring.retired = True
+                ring.close(unlink=True)
+            self.rings = []
+        self.ctrl = None
+        try:
+            self.ctrl_shm.close()
+        except BufferError:
+            pass
+        self.ctrl_shm.unlink()
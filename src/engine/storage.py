@@ -0,0 +1,145 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts        REAL    NOT NULL,
+    camera    TEXT    NOT NULL,
+    kind      TEXT    NOT NULL,
+    name      TEXT    NOT NULL,
+    direction TEXT    NOT NULL,
+    track_id  INTEGER NOT NULL,
+    class     TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_camera_ts ON events (camera, ts);
+
+CREATE TABLE IF NOT EXISTS counts (
+    bucket_start INTEGER NOT NULL,
+    bucket_size  INTEGER NOT NULL,
+    camera       TEXT    NOT NULL,
+    kind         TEXT    NOT NULL,
+    name         TEXT    NOT NULL,
+    direction    TEXT    NOT NULL,
+    class        TEXT    NOT NULL,
+    count        INTEGER NOT NULL,
+    PRIMARY KEY (bucket_start, bucket_size, camera, kind, name, direction, class)
+);
+"""
+
+UPSERT_COUNT = """
+INSERT INTO counts (bucket_start, bucket_size, camera, kind, name, direction, class, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket_start, bucket_size, camera, kind, name, direction, class)
+DO UPDATE SET count = count + excluded.count
+"""
+
+INSERT_EVENT = "INSERT INTO events (ts, camera, kind, name, direction, track_id, class) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+# --- COUNT PERSISTENCE ---
+# record() only puts the frame's events on a queue. A writer thread drains it,
+# aggregates counts into time buckets and commits everything collected since
+# the previous flush in a single transaction, so the counting stage never
+# waits on disk and a crash loses at most one flush interval.
+class CountStore:
+    def __init__(self, db_path, bucket_seconds=60, flush_interval=5.0, max_pending=100000):
+        self.db_path = db_path
+        self.bucket_seconds = int(bucket_seconds)
+        self.flush_interval = flush_interval
+        self.q = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = 0
+        self.stop_event = threading.Event()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Create the schema up front so configuration errors surface at startup
+        conn = sqlite3.connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self.t = threading.Thread(target=self._writer, name="count-store", daemon=True)
+        self.t.start()
+
+    def record(self, camera, timestamp, events):
+        if not events:
+            return
+        try:
+            self.q.put_nowait((camera, timestamp, events))
+        except queue.Full:
+            self.dropped += len(events)
+
+    def _drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.q.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _flush(self, conn, items):
+        if not items:
+            return
+        buckets = {}
+        rows = []
+        for camera, ts, events in items:
+            bucket_start = int(ts // self.bucket_seconds) * self.bucket_seconds
+            for event in events:
+                direction = event.direction or ''
+                rows.append((ts, camera, event.kind, event.name, direction, event.track_id, event.cls_name))
+                key = (bucket_start, self.bucket_seconds, camera, event.kind, event.name, direction, event.cls_name)
+                buckets[key] = buckets.get(key, 0) + 1
+
+        with conn:
+            conn.executemany(INSERT_EVENT, rows)
+            conn.executemany(UPSERT_COUNT, [key + (count,) for key, count in buckets.items()])
+        self.written += len(rows)
+
+    def _writer(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while not self.stop_event.wait(self.flush_interval):
+                try:
+                    self._flush(conn, self._drain())
+                except sqlite3.Error as e:
+                    print(f"[ERROR] Failed to write counts to {self.db_path}: {e}")
+            self._flush(conn, self._drain())
+        finally:
+            conn.close()
+
+    def close(self):
+        self.stop_event.set()
+        self.t.join()
+        if self.dropped:
+            print(f"[WARNING] Count store dropped {self.dropped} events (queue full)")
+
+
+# --- END-OF-RUN REPORT ---
+def write_report(path, cameras, elapsed_seconds):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lines = [
+        "VEHICLE COUNTING REPORT",
+        f"Generated      : {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Execution time : {elapsed_seconds:.1f}s",
+        "",
+    ]
+
+    for cam in cameras:
+        counter = cam.counter
+        lines.append(f"[{cam.name}] source: {cam.source}")
+        lines.append(f"  Total: {sum(counter.vehicle_counts.values())}")
+        for cls_name, count in counter.vehicle_counts.items():
+            lines.append(f"    {cls_name:<10}{count}")
+        for zone_name, counts in counter.zone_counts.items():
+            lines.append(f"  Zone '{zone_name}': " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        for line_name, directions in counter.line_counts.items():
+            for direction, counts in directions.items():
+                lines.append(f"  Line '{line_name}' {direction}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        lines.append("")
+
+    with open(path, 'w') as f:
+        f.write("\n".join(lines))
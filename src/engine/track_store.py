@@ -0,0 +1,92 @@
+import numpy as np
+
+COLUMNS = ('track_id', 'cls', 'first_seen', 'last_seen', 'counted', 'zones_counted',
+           'lines_crossed', 'last_x', 'last_y', 'active')
+
+
+# --- TRACK STATE STORE ---
+# Per-track fields live in fixed-size NumPy columns indexed by slot; a dict
+# maps track IDs to slots. Tracks not seen for longer than the tracker keeps
+# lost tracks (track_buffer) are expired and their slots reused, so memory
+# stays bounded by the number of tracks alive at the same time.
+class TrackStore:
+    def __init__(self, max_age, capacity=256):
+        self.max_age = max_age
+        self.slots = {}
+        self.free = []
+        self.capacity = 0
+        self.track_id = np.zeros(0, dtype=np.int64)
+        self.cls = np.zeros(0, dtype=np.int16)
+        self.first_seen = np.zeros(0, dtype=np.int64)
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.counted = np.zeros(0, dtype=bool)
+        self.zones_counted = np.zeros(0, dtype=np.uint32)
+        self.lines_crossed = np.zeros(0, dtype=np.uint32)
+        self.last_x = np.zeros(0, dtype=np.float32)
+        self.last_y = np.zeros(0, dtype=np.float32)
+        self.active = np.zeros(0, dtype=bool)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        # Pop from the end, so the lowest slots are used first
+        self.free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def upsert(self, ids, clss, xs, ys, frame_id):
+        # Returns the slot of every track, its previous position and whether
+        # it was allocated on this call (new tracks have no previous position)
+        slots = np.empty(len(ids), dtype=np.int64)
+        is_new = np.zeros(len(ids), dtype=bool)
+
+        for i, track_id in enumerate(ids.tolist()):
+            slot = self.slots.get(track_id)
+            if slot is None:
+                if not self.free:
+                    self._grow(self.capacity * 2)
+                slot = self.free.pop()
+                self.slots[track_id] = slot
+                is_new[i] = True
+            slots[i] = slot
+
+        if is_new.any():
+            new_slots = slots[is_new]
+            self.track_id[new_slots] = ids[is_new]
+            self.first_seen[new_slots] = frame_id
+            self.counted[new_slots] = False
+            self.zones_counted[new_slots] = 0
+            self.lines_crossed[new_slots] = 0
+            self.active[new_slots] = True
+            self.last_x[new_slots] = xs[is_new]
+            self.last_y[new_slots] = ys[is_new]
+
+        prev_x = self.last_x[slots]
+        prev_y = self.last_y[slots]
+
+        self.cls[slots] = clss
+        self.last_seen[slots] = frame_id
+        self.last_x[slots] = xs
+        self.last_y[slots] = ys
+        return slots, prev_x, prev_y, is_new
+
+    def expire(self, frame_id):
+        stale = np.flatnonzero(self.active & (frame_id - self.last_seen > self.max_age))
+        if len(stale) == 0:
+            return 0
+
+        self.active[stale] = False
+        for slot, track_id in zip(stale.tolist(), self.track_id[stale].tolist()):
+            del self.slots[track_id]
+            self.free.append(slot)
+        return len(stale)
@@ -0,0 +1,95 @@
+from copy import deepcopy
+from types import SimpleNamespace
+
+import numpy as np
+import yaml
+
+TRACKER_TYPES = ('bytetrack', 'botsort')
+
+
+def tracker_class(tracker_type):
+    # Imported on first use, ultralytics is slow to import
+    if tracker_type == 'bytetrack':
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        return BYTETracker
+    if tracker_type == 'botsort':
+        from ultralytics.trackers.bot_sort import BOTSORT
+        return BOTSORT
+    raise KeyError(f"Unknown tracker_type '{tracker_type}', expected one of {TRACKER_TYPES}")
+
+
+def load_tracker_args(path):
+    with open(path, 'r') as f:
+        return SimpleNamespace(**yaml.safe_load(f))
+
+
+class Tracks:
+    # Tracker output: columns x1, y1, x2, y2, track_id, score, cls
+    # frame_id is the tracker's own frame clock (frames it was updated on)
+    def __init__(self, data=None, frame_id=0):
+        self.data = np.zeros((0, 7), dtype=np.float32) if data is None else data
+        self.frame_id = frame_id
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def boxes(self):
+        return self.data[:, :4]
+
+    @property
+    def ids(self):
+        return self.data[:, 4].astype(np.int64)
+
+    @property
+    def scores(self):
+        return self.data[:, 5]
+
+    @property
+    def clss(self):
+        return self.data[:, 6].astype(np.int64)
+
+
+# --- PER-CAMERA TRACKER ---
+# Same behaviour as model.track(persist=True): the tracker is only updated on
+# frames that have detections.
+class CameraTracker:
+    def __init__(self, tracker_args, frame_rate=30):
+        tracker_cls = tracker_class(tracker_args.tracker_type)
+        self.tracker = tracker_cls(args=tracker_args, frame_rate=frame_rate)
+        self._predicted = None
+
+    @property
+    def frame_id(self):
+        return self.tracker.frame_id
+
+    @property
+    def max_age(self):
+        # Frames a lost track is kept before the tracker removes it for good
+        return self.tracker.max_time_lost
+
+    def predict(self):
+        # Frames without detection (motion gate): the active tracks are carried
+        # forward by the Kalman motion model on copies, so the tracker state and
+        # its frame clock are left exactly as the last update put them
+        if self._predicted is None:
+            self._predicted = [deepcopy(t) for t in self.tracker.tracked_stracks if t.is_activated]
+        if not self._predicted:
+            return Tracks(frame_id=self.frame_id)
+
+        for track in self._predicted:
+            track.predict()
+        data = np.array([track.result[:7] for track in self._predicted], dtype=np.float32)
+        return Tracks(data, self.frame_id)
+
+    def update(self, detections, frame):
+        self._predicted = None
+        if len(detections) == 0:
+            return Tracks(frame_id=self.frame_id)
+
+        tracks = self.tracker.update(detections, frame)
+        if len(tracks) == 0:
+            return Tracks(frame_id=self.frame_id)
+
+        # Drop the trailing detection index column
+        return Tracks(tracks[:, :7].astype(np.float32), self.frame_id)
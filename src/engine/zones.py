@@ -0,0 +1,89 @@
+import numpy as np
+
+# Results follow cv2.pointPolygonTest(..., measureDist=False)
+INSIDE = 1
+ON_EDGE = 0
+OUTSIDE = -1
+
+
+def points_in_polygon(xs, ys, polygon):
+    # Exact integer point-in-polygon test for a whole batch of points.
+    # Same answer as calling cv2.pointPolygonTest on every point.
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    poly = np.asarray(polygon, dtype=np.int64).reshape(-1, 2)
+
+    inside = np.zeros(xs.shape, dtype=bool)
+    on_edge = np.zeros(xs.shape, dtype=bool)
+
+    for i in range(len(poly)):
+        ax, ay = poly[i - 1]
+        bx, by = poly[i]
+        dx, dy = bx - ax, by - ay
+
+        # On the segment: collinear and within its bounding box
+        cross = dx * (ys - ay) - dy * (xs - ax)
+        on_edge |= ((cross == 0)
+                    & (xs >= min(ax, bx)) & (xs <= max(ax, bx))
+                    & (ys >= min(ay, by)) & (ys <= max(ay, by)))
+
+        # Crossing number: edge straddles the horizontal ray and the
+        # intersection lies to the right of the point
+        if dy == 0:
+            continue
+        straddles = (ay > ys) != (by > ys)
+        sign = 1 if dy > 0 else -1
+        left_of = (xs - ax) * dy * sign < (ys - ay) * dx * sign
+        inside ^= straddles & left_of
+
+    result = np.where(inside, INSIDE, OUTSIDE).astype(np.int8)
+    result[on_edge] = ON_EDGE
+    return result
+
+
+# --- RASTERIZED ZONE MASK ---
+# Built once per camera. Every pixel of the zones' bounding rectangle stores a
+# bit per polygon that strictly contains it, so membership for all tracks is a
+# single array lookup per frame.
+class ZoneMask:
+    def __init__(self, polygons):
+        if len(polygons) > 32:
+            raise ValueError("ZoneMask supports at most 32 polygons per camera")
+
+        self.polygons = [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons]
+        self.num_zones = len(self.polygons)
+        dtype = np.uint8 if self.num_zones <= 8 else np.uint16 if self.num_zones <= 16 else np.uint32
+
+        if not self.polygons:
+            self.x0 = self.y0 = 0
+            self.mask = np.zeros((0, 0), dtype=dtype)
+            return
+
+        all_points = np.concatenate(self.polygons)
+        self.x0, self.y0 = all_points.min(axis=0)
+        x1, y1 = all_points.max(axis=0)
+        self.mask = np.zeros((y1 - self.y0 + 1, x1 - self.x0 + 1), dtype=dtype)
+
+        ys, xs = np.mgrid[self.y0:y1 + 1, self.x0:x1 + 1]
+        for bit, polygon in enumerate(self.polygons):
+            inside = points_in_polygon(xs, ys, polygon) == INSIDE
+            self.mask[inside] |= dtype(1 << bit)
+
+    def lookup(self, xs, ys):
+        # Zone bits for integer points; points outside the mask are in no zone
+        xs = np.asarray(xs, dtype=np.int64) - self.x0
+        ys = np.asarray(ys, dtype=np.int64) - self.y0
+        h, w = self.mask.shape
+        valid = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+
+        bits = np.zeros(xs.shape, dtype=self.mask.dtype)
+        bits[valid] = self.mask[ys[valid], xs[valid]]
+        return bits
+
+
+def bottom_centers(boxes):
+    # Counting anchor: bottom-center of the box, truncated like int()
+    boxes = np.asarray(boxes)
+    cx = ((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int64)
+    cy = boxes[:, 3].astype(np.int64)
+    return cx, cy
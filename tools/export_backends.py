@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import yaml
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.engine.config import load_roi_list, CameraConfig
+from src.engine.detector import BACKENDS, Detector, export_model, exported_model_path
+from src.engine.offline import OfflineRunner
+from src.engine.tracking import load_tracker_args
+
+# --- PATH CONFIGURATION ---
+MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
+TRACKER_CONFIG = os.path.join(ROOT_DIR, "config", "my_tracker.yaml")
+ROI_LIST_PATH = os.path.join(ROOT_DIR, "config", "roi-list.txt")
+DATASET_DIR = os.path.join(ROOT_DIR, "datasets")
+CALIBRATION_SPLIT = "valid"
+
+# --- EXPORT / COMPARISON CONFIG ---
+IMG_SIZE = 640
+CONF_THRESHOLD = 0.25
+LATENCY_FRAMES = 200
+WARMUP_FRAMES = 10
+
+
+def write_calibration_yaml(class_names):
+    # INT8 calibration reads the 'val' images of a dataset yaml
+    image_dir = os.path.join(DATASET_DIR, CALIBRATION_SPLIT, "images")
+    if not os.path.isdir(image_dir):
+        raise FileNotFoundError(f"Calibration images not found: {image_dir}")
+    data = {
+        'path': DATASET_DIR,
+        'train': f"{CALIBRATION_SPLIT}/images",
+        'val': f"{CALIBRATION_SPLIT}/images",
+        'names': dict(class_names),
+    }
+    fd, path = tempfile.mkstemp(suffix=".yaml", prefix="calibration_")
+    with os.fdopen(fd, 'w') as f:
+        yaml.safe_dump(data, f)
+    return path
+
+
+def export_backends(backends, force):
+    from ultralytics import YOLO
+
+    class_names = YOLO(MODEL_PATH).names
+    for backend in backends:
+        if backend == 'torch':
+            continue
+        target = exported_model_path(MODEL_PATH, backend)
+        if os.path.exists(target) and not force:
+            print(f"[INFO] {backend:<14} already exported: {target}")
+            continue
+
+        data = write_calibration_yaml(class_names) if backend == 'openvino-int8' else None
+        print(f"[INFO] Exporting {backend}...")
+        t0 = time.time()
+        try:
+            path = export_model(MODEL_PATH, backend, IMG_SIZE, data)
+        finally:
+            if data is not None:
+                os.remove(data)
+        print(f"[INFO] {backend:<14} -> {path} ({time.time() - t0:.0f}s)")
+
+
+def measure_latency(detector, video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < LATENCY_FRAMES + WARMUP_FRAMES:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    timings = []
+    for i, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        detector.detect([frame])
+        if i >= WARMUP_FRAMES:
+            timings.append((time.perf_counter() - t0) * 1000)
+    return np.array(timings)
+
+
+def compare_backends(backends, video_path, roi_name):
+    rois = load_roi_list(ROI_LIST_PATH)
+    if roi_name not in rois:
+        print(f"[ERROR] ROI '{roi_name}' not found in {ROI_LIST_PATH}")
+        return
+    camera_config = CameraConfig(roi_name, video_path, rois[roi_name].zones, rois[roi_name].lines)
+    tracker_args = load_tracker_args(TRACKER_CONFIG)
+
+    results = {}
+    for backend in backends:
+        print(f"\n[INFO] Evaluating backend: {backend}")
+        detector = Detector(MODEL_PATH, conf=CONF_THRESHOLD, imgsz=IMG_SIZE, backend=backend)
+        timings = measure_latency(detector, video_path)
+        camera = OfflineRunner(detector, tracker_args, batch_size=1).run(camera_config, detector.names)
+        results[backend] = (timings, camera.counter.vehicle_counts)
+
+    baseline = results.get('torch', next(iter(results.values())))[1]
+    class_names = list(baseline.keys())
+
+    print("\n" + "-" * 90)
+    print("--- BACKEND COMPARISON ---")
+    print(f"Video: {video_path}")
+    print("-" * 90)
+    header = f"{'BACKEND':<15}|{'MEAN ms':^9}|{'P50 ms':^9}|{'P95 ms':^9}|"
+    for name in class_names:
+        header += f"{name.upper():^8}|"
+    header += f"{'TOTAL':^8}|{'COUNT ERR':^10}"
+    print(header)
+    print("-" * 90)
+
+    base_total = sum(baseline.values())
+    for backend, (timings, counts) in results.items():
+        row = f"{backend:<15}|{timings.mean():^9.1f}|{np.percentile(timings, 50):^9.1f}|{np.percentile(timings, 95):^9.1f}|"
+        for name in class_names:
+            row += f"{counts.get(name, 0):^8}|"
+        total = sum(counts.values())
+        abs_error = sum(abs(counts.get(name, 0) - baseline[name]) for name in class_names)
+        error = 100.0 * abs_error / base_total if base_total else 0.0
+        row += f"{total:^8}|{error:^9.1f}%"
+        print(row)
+    print("-" * 90)
+    print("COUNT ERR = sum of per-class absolute count differences vs. torch, in % of the torch total.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the detector to CPU runtimes and compare them")
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--force", action="store_true", help="re-export even if an export exists")
+    parser.add_argument("--video", help="compare latency and counts of the backends on this video")
+    parser.add_argument("--roi", default="vehicle_vid_12", help="roi-list.txt entry used for counting")
+    args = parser.parse_args()
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"[ERROR] Model not found at: {MODEL_PATH}")
+        sys.exit(1)
+
+    export_backends(args.backend, args.force)
+
+    if args.video:
+        backends = args.backend if 'torch' in args.backend else ['torch'] + args.backend
+        compare_backends(backends, args.video, args.roi)
+
+
+if __name__ == '__main__':
+    main()
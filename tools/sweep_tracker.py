@@ -0,0 +1,203 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import yaml
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from main import CONF_THRESHOLD
+from src.engine.config import CameraConfig, load_roi_list, resolve_source
+from src.engine.detection_cache import CachedDetections, load_or_detect
+from src.engine.detector import BACKENDS, Detector
+from src.engine.multicam import Camera
+from src.engine.offline import OfflineRunner, replay_detections
+from src.engine.tracking import load_tracker_args
+
+# --- PATH CONFIGURATION ---
+MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
+TRACKER_CONFIG = os.path.join(ROOT_DIR, "config", "my_tracker.yaml")
+ROI_LIST_PATH = os.path.join(ROOT_DIR, "config", "roi-list.txt")
+SWEEP_CONFIG = os.path.join(ROOT_DIR, "config", "tracker_sweep.yaml")
+CACHE_DIR = os.path.join(ROOT_DIR, "runs", "detections")
+OUTPUT_PATH = os.path.join(ROOT_DIR, "runs", "tracker_sweep.json")
+
+# --- SWEEP CONFIG ---
+IMG_SIZE = 640
+# Detections are cached at a low confidence, so the grid can sweep 'conf'
+# (the production detector threshold) and low tracker thresholds as well.
+# Settings without 'conf' are replayed at main.py's CONF_THRESHOLD.
+DETECT_CONF = 0.05
+DETECT_BATCH_SIZE = 16
+TOP_RESULTS = 10
+
+
+# --- SWEEP SPEC ---
+# config/tracker_sweep.yaml:
+#   videos: [{source, roi, counts: {class: reference count}}]
+#   grid:   {tracker key or 'conf': [values...]}
+def load_sweep(path):
+    with open(path, 'r') as f:
+        spec = yaml.safe_load(f) or {}
+    rois = load_roi_list(ROI_LIST_PATH)
+
+    entries = spec.get('videos') or []
+    if not entries:
+        print(f"[ERROR] No videos configured in {path}.")
+        print(" -> Add your own videos and manual counts per class (see the example entry).")
+        sys.exit(1)
+
+    videos = []
+    for entry in entries:
+        source = resolve_source(entry['source'], ROOT_DIR)
+        roi = entry.get('roi', os.path.splitext(os.path.basename(source))[0])
+        if roi not in rois:
+            raise ValueError(f"ROI '{roi}' not found in {ROI_LIST_PATH}")
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"Video not found: {source}")
+        config = CameraConfig(entry.get('name', roi), source, rois[roi].zones, rois[roi].lines)
+        videos.append((config, dict(entry['counts'])))
+
+    grid = spec.get('grid', {})
+    if not grid:
+        raise ValueError(f"{path} needs a 'grid'")
+    keys = list(grid)
+    settings = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    return videos, settings
+
+
+def count_error(counts, reference):
+    # Sum of per-class absolute differences, over the classes with a reference count
+    return sum(abs(counts.get(name, 0) - ref) for name, ref in reference.items())
+
+
+# --- REPLAY WORKERS ---
+# Each worker loads the cached detections once and then replays tracking and
+# counting for one grid setting at a time; the detector is never involved.
+_worker = {}
+
+
+def _init_worker(videos, base_args, class_names, conf):
+    _worker['videos'] = [(config, CachedDetections.load(path), reference) for config, path, reference in videos]
+    _worker['base_args'] = base_args
+    _worker['class_names'] = class_names
+    _worker['conf'] = conf
+
+
+def _evaluate(setting):
+    conf = setting.get('conf', _worker['conf'])
+    tracker_args = SimpleNamespace(**{**_worker['base_args'], **{k: v for k, v in setting.items() if k != 'conf'}})
+    results = []
+    for config, detections, reference in _worker['videos']:
+        camera = Camera(config, tracker_args, _worker['class_names'])
+        for _ in replay_detections(camera, detections.frames(conf), detections.frame_size):
+            pass
+        counts = dict(camera.counter.vehicle_counts)
+        results.append({'video': config.name, 'counts': counts, 'error': count_error(counts, reference)})
+    return setting, results
+
+
+def run_sweep(videos, settings, base_args, class_names, workers, conf=CONF_THRESHOLD):
+    # conf: detector threshold for settings that do not sweep it
+    reference_total = sum(sum(reference.values()) for _, _, reference in videos)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(videos, base_args, class_names, conf)) as pool:
+        results = list(pool.map(_evaluate, settings))
+
+    scored = []
+    for setting, per_video in results:
+        error = sum(r['error'] for r in per_video)
+        scored.append({
+            'setting': setting,
+            'error': error,
+            'error_pct': 100.0 * error / reference_total if reference_total else 0.0,
+            'videos': per_video,
+        })
+    scored.sort(key=lambda r: r['error'])
+    return scored
+
+
+def print_results(scored, keys, top):
+    print("\n" + "-" * 90)
+    print("--- TRACKER SWEEP ---")
+    print("-" * 90)
+    header = f"{'RANK':<6}|" + "".join(f"{key:^20}|" for key in keys) + f"{'ABS ERR':^9}|{'ERR %':^8}"
+    print(header)
+    print("-" * 90)
+    for rank, result in enumerate(scored[:top], start=1):
+        row = f"{rank:<6}|" + "".join(f"{str(result['setting'][key]):^20}|" for key in keys)
+        row += f"{result['error']:^9}|{result['error_pct']:^8.1f}"
+        print(row)
+    print("-" * 90)
+    print("ABS ERR = sum of per-class absolute count differences vs. the reference counts, over all videos.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep tracker settings on cached detections against reference counts")
+    parser.add_argument("--config", default=SWEEP_CONFIG, help="videos, reference counts and parameter grid")
+    parser.add_argument("--backend", choices=BACKENDS, default='torch')
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--detect-conf", type=float, default=DETECT_CONF,
+                        help="confidence the detections are cached at (lowest 'conf' the grid can use)")
+    parser.add_argument("--conf", type=float, default=CONF_THRESHOLD,
+                        help="detector threshold replayed when the grid has no 'conf' (default: main.py's)")
+    parser.add_argument("--crop-margin", type=int, default=None, help="detect only the ROI crop (as main.py --crop)")
+    parser.add_argument("--detect-workers", type=int, default=1, help="processes for the one-time detection pass")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes replaying the grid")
+    parser.add_argument("--top", type=int, default=TOP_RESULTS)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    videos, settings = load_sweep(args.config)
+    conf_values = [s.get('conf', args.conf) for s in settings]
+    if min(conf_values) < args.detect_conf:
+        print(f"[ERROR] Detector 'conf' goes below the cached detection confidence {args.detect_conf}")
+        sys.exit(1)
+
+    # 1. Detections, once per video and model (cached on disk)
+    detector = None
+    runner = None
+    cached = []
+    for config, reference in videos:
+        if detector is None:
+            if not os.path.exists(MODEL_PATH):
+                print(f"[ERROR] Model not found at: {MODEL_PATH}")
+                sys.exit(1)
+            detector = Detector(MODEL_PATH, conf=args.detect_conf, imgsz=args.imgsz, backend=args.backend)
+            runner = OfflineRunner(detector, load_tracker_args(TRACKER_CONFIG), DETECT_BATCH_SIZE,
+                                   args.detect_workers, args.crop_margin)
+        detections = load_or_detect(runner, config, CACHE_DIR)
+        cached.append((config, detections.path, reference))
+
+    # 2. Tracking + counting for every grid setting, in parallel
+    base_args = vars(runner.replay_tracker_args())
+    print(f"\n[INFO] Replaying {len(settings)} setting(s) x {len(videos)} video(s) on {args.workers} worker(s)...")
+    if 'conf' not in settings[0]:
+        print(f"[INFO] Detector threshold: {args.conf}")
+    t0 = time.time()
+    scored = run_sweep(cached, settings, base_args, detector.names, args.workers, args.conf)
+    print(f"[INFO] Sweep finished in {time.time() - t0:.1f}s")
+
+    print_results(scored, list(settings[0]), args.top)
+    best = scored[0]
+    print("\nBest setting (config/my_tracker.yaml):")
+    print(yaml.safe_dump({k: v for k, v in best['setting'].items() if k != 'conf'}, sort_keys=False).rstrip())
+    if 'conf' in best['setting']:
+        print(f"CONF_THRESHOLD = {best['setting']['conf']}  (main.py)")
+    for result in best['videos']:
+        print(f"  {result['video']}: {result['counts']} (error {result['error']})")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'base': base_args, 'results': scored}, f, indent=2)
+    print(f"[INFO] All results saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
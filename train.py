@@ -2,6 +2,8 @@ import os
 import sys
 from ultralytics import YOLO
 
+from src.data_preprocessing.train_cache import CachedDetectionTrainer
+
 # --- DYNAMIC PATH CONFIGURATION ---
 CURRENT_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(CURRENT_SCRIPT_DIR)
@@ -12,7 +14,11 @@ PROJECT_DIR = os.path.join(ROOT_DIR, "runs", "detect")
 BATCH_SIZE = 8
 IMG_SIZE = 640
 WORKERS = 2
-EPOCHS = 50 
+EPOCHS = 50
+
+# Decode and resize every image once into <split>/.image_cache instead of every
+# epoch. Rebuilt automatically when the images or IMG_SIZE change.
+USE_IMAGE_CACHE = True
 
 def main():
     print("=" * 40)
@@ -29,6 +35,7 @@ def main():
     print(f"[INFO] Config File  : {DATA_YAML_PATH}")
     print(f"[INFO] Batch Size   : {BATCH_SIZE}")
     print(f"[INFO] Workers      : {WORKERS}")
+    print(f"[INFO] Image Cache  : {'on' if USE_IMAGE_CACHE else 'off'}")
     print("-" * 40)
 
     # 2. Load Model
@@ -49,7 +56,8 @@ def main():
             project=PROJECT_DIR,
             name='train_run',
             exist_ok=True,
-            verbose=True
+            verbose=True,
+            trainer=CachedDetectionTrainer if USE_IMAGE_CACHE else None
         )
         print("\n" + "=" * 40)
         print("[SUCCESS] Training completed successfully!")